@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from api.cache import bump_data_version, get_data_version
+from users.models import User
+
+# Поля пользователя, которые хранятся в кэше токенов. Снимок содержит
+# все поля модели, поэтому пользователь из кэша не догружается из базы.
+SNAPSHOT_FIELDS = tuple(field.attname
+                        for field in User._meta.concrete_fields)
+
+
+# Версии пользователей хранятся в отдельном кэше: их много,
+# и они не должны вытеснять версии справочных данных.
+VERSION_CACHE = 'auth'
+
+
+def user_namespace(user_id):
+    return f'user-{user_id}'
+
+
+def get_user_version(user_id):
+    return get_data_version(user_namespace(user_id), VERSION_CACHE)
+
+
+def invalidate_user(user_id):
+    """Делает недействительными закэшированные токены пользователя
+    во всех процессах."""
+
+    bump_data_version(user_namespace(user_id), VERSION_CACHE)
+
+
+class TokenCache:
+    """LRU-кэш процесса: ключ токена -> снимок пользователя."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, version, values):
+        with self.lock:
+            self.entries[key] = (
+                time.monotonic() + settings.AUTH_TOKEN_CACHE_TTL,
+                version, values)
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену без запроса к базе на каждый запрос.
+    Снимок пользователя хранится в кэше процесса не дольше
+    AUTH_TOKEN_CACHE_TTL и сверяется с версией пользователя в общем кэше,
+    которая меняется при сохранении пользователя и удалении токена."""
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is not None:
+            cached_version, values = entry[1:]
+            if get_user_version(values['id']) == cached_version:
+                return self.snapshot_credentials(key, values)
+        # Версия читается до загрузки пользователя: если пользователь
+        # изменится между запросами, в кэш попадёт уже устаревшая версия,
+        # а не свежая версия вместе со старым снимком.
+        user_id = self.get_model().objects.filter(key=key).values_list(
+            'user_id', flat=True).first()
+        if user_id is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        version = get_user_version(user_id)
+        user, token = super().authenticate_credentials(key)
+        if user.pk != user_id:
+            return user, token
+        token_cache.set(key, version, {
+            field: getattr(user, field) for field in SNAPSHOT_FIELDS})
+        return user, token
+
+    def snapshot_credentials(self, key, values):
+        # from_db ожидает значения в порядке полей модели.
+        field_names = [field.attname
+                       for field in User._meta.concrete_fields
+                       if field.attname in values]
+        user = User.from_db('default', field_names,
+                            [values[name] for name in field_names])
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        return user, self.get_model()(key=key, user=user)
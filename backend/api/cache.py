@@ -0,0 +1,74 @@
+import hashlib
+import time
+
+from django.core.cache import cache, caches
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.renderers import JSONRenderer
+
+VERSION_KEY = 'reference-data-version:{}'
+RESPONSE_KEY = 'reference-data:{}:{}:{}'
+
+
+def get_data_version(namespace, alias='versions'):
+    """Возвращает текущую версию справочных данных.
+    Версии хранятся в отдельном кэше alias, чтобы их не вытесняли
+    закэшированные ответы."""
+
+    versions = caches[alias]
+    version = versions.get(VERSION_KEY.format(namespace))
+    if version is None:
+        # Начальная версия уникальна, чтобы после вытеснения ключа
+        # из кэша версия не совпала ни с одной из прежних.
+        initial = time.time_ns()
+        versions.add(VERSION_KEY.format(namespace), initial, timeout=None)
+        version = versions.get(VERSION_KEY.format(namespace), initial)
+    return version
+
+
+def bump_data_version(namespace, alias='versions'):
+    """Увеличивает версию справочных данных,
+    делая недействительными все закэшированные ответы."""
+
+    versions = caches[alias]
+    try:
+        return versions.incr(VERSION_KEY.format(namespace))
+    except ValueError:
+        version = time.time_ns()
+        versions.set(VERSION_KEY.format(namespace), version, timeout=None)
+        return version
+
+
+class ReferenceDataCacheMixin:
+    """Миксин для справочных вьюсетов.
+    Кэширует готовый JSON ответа по версии данных
+    и отвечает 304 Not Modified на запросы с актуальным ETag."""
+
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve,
+                                    request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        version = get_data_version(self.cache_namespace)
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        etag = f'"{self.cache_namespace}-{version}-{path}"'
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in (tag.strip() for tag in if_none_match.split(',')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+        key = RESPONSE_KEY.format(self.cache_namespace, version, path)
+        content = cache.get(key)
+        if content is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            content = JSONRenderer().render(response.data)
+            cache.set(key, content)
+        response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        return response
@@ -0,0 +1,200 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from api.search import update_search_vector
+from foodgram.models import (Cart, FavoriteRecipe, Ingredient,
+                             IngredientRecipe, Recipe, Tag)
+from users.models import Subscription, User
+
+# Показатель распределения Ципфа: чем больше, тем сильнее перекос
+# в сторону популярных авторов, рецептов и ингредиентов.
+ZIPF_EXPONENT = 1.1
+# Параметр Парето для числа избранного, покупок и подписок у пользователя.
+PARETO_ALPHA = 1.5
+PARETO_MEAN = PARETO_ALPHA / (PARETO_ALPHA - 1)
+PUBLISHED_DAYS = 3 * 365
+DEFAULT_PASSWORD = 'foodgram-dataset'
+
+WORDS = (
+    'суп', 'салат', 'пирог', 'запеканка', 'рагу', 'каша', 'омлет', 'паста',
+    'плов', 'борщ', 'блины', 'котлеты', 'сырники', 'жаркое', 'оладьи',
+    'домашний', 'быстрый', 'летний', 'острый', 'сливочный', 'овощной',
+    'куриный', 'грибной', 'рыбный', 'сладкий', 'праздничный', 'постный',
+)
+
+
+def batches(items, size):
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+@contextmanager
+def manual_pub_date():
+    """Позволяет задать дату публикации рецептов при bulk_create."""
+
+    field = Recipe._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class DatasetGenerator:
+    """Наполняет базу синтетическими данными с перекосом, как в жизни:
+    у немногих авторов много рецептов, немногие рецепты часто попадают
+    в избранное и покупки. Результат зависит только от seed."""
+
+    def __init__(self, seed=0, batch_size=5000, prefix='dataset'):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.counts = {}
+
+    def zipf_weights(self, size):
+        """Накопленные веса Ципфа для популяции в случайном порядке."""
+
+        weights = [1 / rank ** ZIPF_EXPONENT for rank in range(1, size + 1)]
+        self.rng.shuffle(weights)
+        return list(accumulate(weights))
+
+    def skewed_count(self, mean, limit):
+        """Число элементов у пользователя со средним mean и длинным хвостом."""
+
+        return min(int(self.rng.paretovariate(PARETO_ALPHA)
+                       * mean / PARETO_MEAN), limit)
+
+    def weighted_sample(self, population, cum_weights, k):
+        """Выбирает k разных элементов с учётом весов."""
+
+        chosen = set()
+        for _ in range(10):
+            if len(chosen) >= k:
+                break
+            chosen.update(self.rng.choices(population, cum_weights=cum_weights,
+                                           k=k - len(chosen)))
+        return list(chosen)[:k]
+
+    def bulk_create(self, model, objects):
+        created = 0
+        for batch in batches(objects, self.batch_size):
+            model.objects.bulk_create(batch)
+            created += len(batch)
+        self.counts[model._meta.label] = (
+            self.counts.get(model._meta.label, 0) + created)
+
+    def generate(self, users, recipes, ingredients_per_recipe=8,
+                 favorites_per_user=20, carts_per_user=5,
+                 subscriptions_per_user=10):
+        """Создаёт пользователей, рецепты и связи между ними."""
+
+        with transaction.atomic():
+            tags = self.reference_tags()
+            ingredients = list(self.reference_ingredients())
+            user_ids = self.create_users(users)
+            recipe_ids = self.create_recipes(recipes, user_ids, tags,
+                                             ingredients,
+                                             ingredients_per_recipe)
+            self.create_user_links(user_ids, recipe_ids, favorites_per_user,
+                                   carts_per_user, subscriptions_per_user)
+        for batch in batches(recipe_ids, self.batch_size):
+            update_search_vector(batch)
+        return self.counts
+
+    def reference_tags(self):
+        if not Tag.objects.exists():
+            for number, word in enumerate(WORDS[:5]):
+                Tag.objects.create(name=word, slug=f'{self.prefix}-{number}',
+                                   color=f'#{number:06x}')
+        return list(Tag.objects.order_by('pk'))
+
+    def reference_ingredients(self):
+        if not Ingredient.objects.exists():
+            self.bulk_create(Ingredient, (
+                Ingredient(name=f'{word} {number}', measurement_unit='г')
+                for number in range(100) for word in WORDS))
+        return Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+
+    def create_users(self, count):
+        password = make_password(DEFAULT_PASSWORD)
+        self.bulk_create(User, (
+            User(username=f'{self.prefix}-{number}',
+                 email=f'{self.prefix}-{number}@foodgram.com',
+                 first_name='Имя', last_name='Фамилия', password=password)
+            for number in range(count)))
+        return list(User.objects.filter(
+            username__startswith=f'{self.prefix}-'
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_recipes(self, count, user_ids, tags, ingredient_ids,
+                       ingredients_per_recipe):
+        rng = self.rng
+        author_weights = self.zipf_weights(len(user_ids))
+        ingredient_weights = self.zipf_weights(len(ingredient_ids))
+        now = timezone.now()
+        recipe_tags = []
+
+        def recipes():
+            for number in range(count):
+                chosen = rng.sample(tags, rng.randint(1, min(3, len(tags))))
+                recipe_tags.append(chosen)
+                words = rng.sample(WORDS, 3)
+                yield Recipe(
+                    name=f'{" ".join(words[:2]).capitalize()} {number}',
+                    text=' '.join(rng.choices(WORDS, k=30)),
+                    cooking_time=rng.randint(5, 180),
+                    author_id=rng.choices(user_ids,
+                                          cum_weights=author_weights)[0],
+                    pub_date=now - timedelta(
+                        seconds=rng.randint(0, PUBLISHED_DAYS * 86400)),
+                    tag_ids=Recipe.tag_ids_of(chosen),
+                )
+
+        first_id = Recipe.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        with manual_pub_date():
+            self.bulk_create(Recipe, recipes())
+        recipe_ids = list(Recipe.objects.filter(
+            pk__gt=first_id
+        ).order_by('pk').values_list('pk', flat=True))
+
+        self.bulk_create(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.pk)
+            for recipe_id, chosen in zip(recipe_ids, recipe_tags)
+            for tag in chosen))
+        self.bulk_create(IngredientRecipe, (
+            IngredientRecipe(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                             amount=rng.randint(1, 500))
+            for recipe_id in recipe_ids
+            for ingredient_id in self.weighted_sample(
+                ingredient_ids, ingredient_weights,
+                self.skewed_count(ingredients_per_recipe,
+                                  len(ingredient_ids)) or 1)))
+        return recipe_ids
+
+    def create_user_links(self, user_ids, recipe_ids, favorites_per_user,
+                          carts_per_user, subscriptions_per_user):
+        recipe_weights = self.zipf_weights(len(recipe_ids))
+        author_weights = self.zipf_weights(len(user_ids))
+        for model, per_user in ((FavoriteRecipe, favorites_per_user),
+                                (Cart, carts_per_user)):
+            self.bulk_create(model, (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in self.weighted_sample(
+                    recipe_ids, recipe_weights,
+                    self.skewed_count(per_user, len(recipe_ids)))))
+        self.bulk_create(Subscription, (
+            Subscription(subscriber_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in self.weighted_sample(
+                user_ids, author_weights,
+                self.skewed_count(subscriptions_per_user, len(user_ids)))
+            if author_id != user_id))
@@ -0,0 +1,144 @@
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import Q
+from django.http import FileResponse
+from django.utils import timezone
+
+from api.pdf_renderer import render_shopping_list_pdf
+from api.shopping_list import build_shopping_list
+from foodgram.models import ShoppingListExport
+
+EXPORT_FILENAME = 'Список покупок.pdf'
+
+
+def get_cart_hash(shopping_list):
+    """Вычисляет хэш содержимого списка покупок."""
+
+    content = json.dumps(shopping_list, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def find_export(user, shopping_list, statuses=(ShoppingListExport.DONE,)):
+    """Ищет выгрузку с тем же содержимым корзины."""
+
+    return ShoppingListExport.objects.filter(
+        user=user, cart_hash=get_cart_hash(shopping_list),
+        status__in=statuses
+    ).first()
+
+
+def request_export(user, shopping_list):
+    """Ставит выгрузку списка покупок в очередь,
+    если такая же выгрузка ещё не создана."""
+
+    export = find_export(user, shopping_list, statuses=(
+        ShoppingListExport.PENDING, ShoppingListExport.PROCESSING,
+        ShoppingListExport.DONE))
+    if export is None:
+        export = ShoppingListExport.objects.create(
+            user=user, cart_hash=get_cart_hash(shopping_list))
+    return export
+
+
+def render_export(export, shopping_list=None):
+    """Генерирует файл выгрузки и удаляет прежние выгрузки пользователя."""
+
+    if shopping_list is None:
+        shopping_list = build_shopping_list(export.user)
+    export.cart_hash = get_cart_hash(shopping_list)
+    export.file.save(f'{export.cart_hash}.pdf',
+                     ContentFile(render_shopping_list_pdf(shopping_list)),
+                     save=False)
+    export.status = ShoppingListExport.DONE
+    export.save()
+    for old_export in ShoppingListExport.objects.filter(
+            user=export.user, status=ShoppingListExport.DONE,
+            pk__lt=export.pk):
+        old_export.file.delete(save=False)
+        old_export.delete()
+    return export
+
+
+def export_response(export):
+    """Отдаёт файл готовой выгрузки."""
+
+    return FileResponse(export.file.open('rb'), as_attachment=True,
+                        filename=EXPORT_FILENAME,
+                        content_type='application/pdf')
+
+
+def claim_pending_exports(limit):
+    """Забирает из очереди выгрузки для обработки.
+    Выгрузки, захваченные другими обработчиками, пропускаются.
+    Выгрузки, которые дольше SHOPPING_LIST_EXPORT_CLAIM_TIMEOUT
+    остаются в обработке, например после падения обработчика,
+    забираются повторно."""
+
+    now = timezone.now()
+    stale_before = now - timedelta(
+        seconds=settings.SHOPPING_LIST_EXPORT_CLAIM_TIMEOUT)
+    with transaction.atomic():
+        exports = list(ShoppingListExport.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            Q(status=ShoppingListExport.PENDING)
+            | Q(status=ShoppingListExport.PROCESSING,
+                claimed__lt=stale_before)
+            | Q(status=ShoppingListExport.PROCESSING, claimed=None)
+        ).order_by('created').values_list('pk', flat=True)[:limit])
+        ShoppingListExport.objects.filter(pk__in=exports).update(
+            status=ShoppingListExport.PROCESSING, claimed=now)
+    return exports
+
+
+def process_export(export_id):
+    """Обрабатывает одну выгрузку из очереди."""
+
+    export = ShoppingListExport.objects.select_related('user').get(
+        pk=export_id)
+    try:
+        render_export(export)
+    except Exception:
+        ShoppingListExport.objects.filter(pk=export_id).update(
+            status=ShoppingListExport.FAILED)
+        raise
+    return export_id
+
+
+def create_export_pool(workers):
+    """Пул процессов для выгрузок. Создаётся один раз на обработчик,
+    чтобы шрифты и фон PDF загружались в каждом процессе однажды."""
+
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def process_pending_exports(executor, workers):
+    """Обрабатывает очередь выгрузок в пуле процессов executor.
+    Возвращает пары (id выгрузки, текст ошибки или None)."""
+
+    exports = claim_pending_exports(limit=workers * 4)
+    if not exports:
+        return []
+    # Процессы пула создаются копированием текущего процесса,
+    # поэтому открытые соединения с базой не должны в них попасть.
+    connections.close_all()
+    return list(zip(exports, executor.map(safe_process_export, exports)))
+
+
+def safe_process_export(export_id):
+    """Обрабатывает выгрузку в процессе пула
+    и возвращает текст ошибки вместо исключения."""
+
+    try:
+        process_export(export_id)
+    except Exception as error:
+        return str(error)
+    finally:
+        connections.close_all()
+    return None
@@ -1,12 +1,15 @@
 from django_filters.rest_framework import FilterSet, filters
 
-from foodgram.models import Ingredient, Recipe, Tag
+from api.search import search_recipes
+
+from foodgram.models import Recipe, Tag
 
 
 class RecipeFilter(FilterSet):
     """Фильтр для рецептов."""
 
     name = filters.CharFilter(lookup_expr='icontains')
+    search = filters.CharFilter(method='get_search')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
@@ -17,31 +20,36 @@ class RecipeFilter(FilterSet):
         queryset=Tag.objects.all(),
         field_name='tags__slug',
         to_field_name='slug',
+        method='get_tags',
     )
 
     class Meta:
         model = Recipe
         fields = ('author', 'tags', 'is_favorited',
-                  'is_in_shopping_cart', 'name')
+                  'is_in_shopping_cart', 'name', 'search')
 
-    def get_is_favorited(self, queryset, name, value):
-        user = self.request.user
-        if value and user.is_authenticated:
-            return queryset.filter(favorite__user=user)
-        return queryset
+    def get_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.with_any_tag(value)
 
-    def get_is_in_shopping_cart(self, queryset, name, value):
-        user = self.request.user
-        if value and user.is_authenticated:
-            return queryset.filter(cart_recipes__user=user)
-        return queryset
+    def get_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value)
 
+    def get_is_favorited(self, queryset, name, value):
+        return self.filter_user_flag(queryset, 'is_favorited', value)
 
-class IngredientFilter(FilterSet):
-    """Фильтр для ингридиентов."""
+    def get_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_user_flag(queryset, 'is_in_shopping_cart', value)
 
-    name = filters.CharFilter(lookup_expr='icontains')
+    def filter_user_flag(self, queryset, flag, value):
+        """Фильтрует по признаку, вычисленному в with_user_flags."""
 
-    class Meta:
-        model = Ingredient
-        fields = ('name',)
+        user = self.request.user
+        if not value or not user.is_authenticated:
+            return queryset
+        if flag not in queryset.query.annotations:
+            queryset = queryset.with_user_flags(user)
+        return queryset.filter(**{flag: True})
@@ -0,0 +1,77 @@
+import base64
+import binascii
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+from rest_framework import serializers
+
+BASE64_MARKER = ';base64,'
+DECODE_CHUNK_SIZE = 64 * 1024
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+
+def get_image_extension(header):
+    """Определяет формат изображения по первым байтам файла."""
+
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def decode_base64_image(data):
+    """Декодирует изображение из data URL по частям.
+
+    Размер проверяется до декодирования и по ходу него,
+    формат - по заголовку первой декодированной части,
+    размеры в пикселях - до полного разбора изображения,
+    целостность - полным разбором."""
+
+    start = data.find(BASE64_MARKER)
+    if start == -1:
+        raise serializers.ValidationError('Некорректное изображение.')
+    start += len(BASE64_MARKER)
+    max_size = settings.RECIPE_IMAGE_MAX_SIZE
+    if (len(data) - start) // 4 * 3 > max_size + 2:
+        raise serializers.ValidationError(
+            f'Размер изображения больше {max_size // 1024} КиБ.')
+
+    buffer = BytesIO()
+    extension = None
+    for offset in range(start, len(data), DECODE_CHUNK_SIZE):
+        try:
+            chunk = base64.b64decode(
+                data[offset:offset + DECODE_CHUNK_SIZE], validate=True)
+        except binascii.Error:
+            raise serializers.ValidationError('Некорректное изображение.')
+        if extension is None:
+            extension = get_image_extension(chunk)
+            if extension is None:
+                raise serializers.ValidationError(
+                    'Неподдерживаемый формат изображения.')
+        buffer.write(chunk)
+        if buffer.tell() > max_size:
+            raise serializers.ValidationError(
+                f'Размер изображения больше {max_size // 1024} КиБ.')
+
+    buffer.seek(0)
+    try:
+        image = Image.open(buffer)
+        width, height = image.size
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(
+                'Слишком большое разрешение изображения.')
+        # Обрезанный файл обнаруживается только при полном разборе.
+        image.load()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise serializers.ValidationError('Некорректное изображение.')
+    return ContentFile(buffer.getvalue(), name=f'image.{extension}')
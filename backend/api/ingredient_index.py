@@ -0,0 +1,84 @@
+from bisect import bisect_left
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+
+from api.cache import get_data_version
+from foodgram.models import Ingredient
+
+
+class IngredientIndex:
+    """Неизменяемый индекс ингредиентов для поиска по названию.
+    Сначала отдаёт совпадения по началу названия, затем по подстроке."""
+
+    def __init__(self, ingredients):
+        rows = sorted(
+            (ingredient['name'].casefold(), ingredient['id'], ingredient)
+            for ingredient in ingredients
+        )
+        self.keys = tuple(key for key, _, _ in rows)
+        self.items = tuple(ingredient for _, _, ingredient in rows)
+
+    def search(self, query, limit):
+        """Возвращает не больше limit ингредиентов, подходящих под query."""
+
+        query = query.strip().casefold()
+        if not query:
+            return list(self.items[:limit])
+        found = []
+        position = bisect_left(self.keys, query)
+        while (position < len(self.keys) and len(found) < limit
+               and self.keys[position].startswith(query)):
+            found.append(self.items[position])
+            position += 1
+        if len(found) == limit:
+            return found
+        for key, ingredient in zip(self.keys, self.items):
+            if query in key and not key.startswith(query):
+                found.append(ingredient)
+                if len(found) == limit:
+                    break
+        return found
+
+
+class IngredientIndexHolder:
+    """Хранит индекс текущего процесса и перестраивает его,
+    когда меняется версия данных ингредиентов. Срок жизни
+    INGREDIENT_INDEX_TTL ограничивает устаревание индекса,
+    если кэш версий не общий для всех процессов."""
+
+    def __init__(self):
+        self.index = None
+        self.version = None
+        self.built_at = 0
+        self.lock = Lock()
+
+    def is_fresh(self, version):
+        return (self.index is not None and self.version == version
+                and monotonic() - self.built_at
+                < settings.INGREDIENT_INDEX_TTL)
+
+    def get(self):
+        version = get_data_version('ingredients')
+        if self.is_fresh(version):
+            return self.index
+        with self.lock:
+            if not self.is_fresh(version):
+                self.index = IngredientIndex(Ingredient.objects.values(
+                    'id', 'name', 'measurement_unit'))
+                self.version = version
+                self.built_at = monotonic()
+            return self.index
+
+
+ingredient_index = IngredientIndexHolder()
+
+
+def search_ingredients(name=None):
+    """Ищет ингредиенты по названию без обращения к базе данных."""
+
+    index = ingredient_index.get()
+    if name is None:
+        return list(index.items)
+    return index.search(name, settings.INGREDIENT_SEARCH_LIMIT)
@@ -0,0 +1,49 @@
+import tracemalloc
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from api.pdf_renderer import render_shopping_list_pdf
+
+
+class Command(BaseCommand):
+    """Замеряет время и память генерации pdf списка покупок."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredients', type=int, default=60)
+        parser.add_argument('--recipes', type=int, default=10)
+        parser.add_argument('--image', default='',
+                            help='Путь к изображению относительно MEDIA_ROOT')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        shopping_list = {
+            'ingredients': [
+                {'name': f'ингредиент {number}', 'measurement_unit': 'г',
+                 'amount': number}
+                for number in range(options['ingredients'])
+            ],
+            'recipes': [
+                {'id': number, 'name': f'Рецепт {number}',
+                 'image': options['image']}
+                for number in range(options['recipes'])
+            ],
+        }
+        started = perf_counter()
+        render_shopping_list_pdf(shopping_list)
+        first = perf_counter() - started
+
+        started = perf_counter()
+        for _ in range(options['repeat']):
+            render_shopping_list_pdf(shopping_list)
+        average = (perf_counter() - started) / options['repeat']
+
+        tracemalloc.start()
+        render_shopping_list_pdf(shopping_list)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f'первый запрос: {first * 1000:.1f} мс, '
+            f'последующие: {average * 1000:.1f} мс, '
+            f'пик памяти: {peak // 1024} КиБ'
+        )
@@ -0,0 +1,56 @@
+import statistics
+from time import perf_counter
+
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from api.dataset import DatasetGenerator
+from api.search import search_recipes
+from foodgram.models import Recipe
+
+
+class Command(BaseCommand):
+    """Сравнивает поиск рецептов по icontains и полнотекстовый поиск
+    на данных текущей базы. С --recipes сначала создаёт синтетические
+    рецепты; они откатываются после замера."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='+')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--recipes', type=int, default=0,
+                            help='Создать столько рецептов перед замером')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['recipes']:
+                DatasetGenerator(
+                    seed=options['seed'], prefix='search'
+                ).generate(users=max(options['recipes'] // 100, 1),
+                           recipes=options['recipes'])
+            self.compare(options)
+            transaction.set_rollback(True)
+
+    def compare(self, options):
+        self.stdout.write(f'Рецептов в базе: {Recipe.objects.count()}')
+        for query in options['queries']:
+            self.bench(
+                'icontains', query, options,
+                lambda: Recipe.objects.filter(name__icontains=query))
+            self.bench(
+                'search', query, options,
+                lambda: search_recipes(Recipe.objects.all(), query))
+
+    def bench(self, label, query, options, make_queryset):
+        timings = []
+        for _ in range(options['repeat']):
+            started = perf_counter()
+            found = list(make_queryset()[:options['limit']])
+            timings.append(perf_counter() - started)
+        names = ', '.join(recipe.name for recipe in found[:3])
+        self.stdout.write(
+            f'{label} "{query}": медиана '
+            f'{statistics.median(timings) * 1000:.1f} мс, '
+            f'минимум {min(timings) * 1000:.1f} мс, '
+            f'найдено {len(found)}: {names}')
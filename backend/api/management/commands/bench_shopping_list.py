@@ -0,0 +1,61 @@
+import random
+from time import perf_counter
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.shopping_list import build_shopping_list
+from foodgram.models import Cart, Ingredient, IngredientRecipe, Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Замеряет сборку списка покупок для корзин разного размера.
+    Все созданные данные откатываются после замера."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10, 100, 1000])
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            Ingredient.objects.bulk_create(
+                Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+                for number in range(500 - Ingredient.objects.count()))
+            ingredients = list(Ingredient.objects.all()[:500])
+            for size in options['sizes']:
+                self.bench_cart(size, ingredients, options)
+            transaction.set_rollback(True)
+
+    def bench_cart(self, size, ingredients, options):
+        user = User.objects.create(username=f'bench-{size}',
+                                   email=f'bench-{size}@foodgram.com')
+        Recipe.objects.bulk_create(
+            Recipe(name=f'Рецепт {number}', text='-', cooking_time=10,
+                   author=user)
+            for number in range(size))
+        recipes = list(user.recipes.all())
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                             amount=random.randint(1, 500))
+            for recipe in recipes
+            for ingredient in random.sample(
+                ingredients, options['ingredients_per_recipe']))
+        Cart.objects.bulk_create(Cart(user=user, recipe=recipe)
+                                 for recipe in recipes)
+
+        timings = []
+        for _ in range(options['repeat']):
+            with CaptureQueriesContext(connection) as queries:
+                started = perf_counter()
+                shopping_list = build_shopping_list(user)
+                timings.append(perf_counter() - started)
+        self.stdout.write(
+            f'Рецептов в корзине: {size}, '
+            f'время: {min(timings) * 1000:.1f} мс, '
+            f'запросов: {len(queries)}, '
+            f'строк: {len(shopping_list["ingredients"])}'
+        )
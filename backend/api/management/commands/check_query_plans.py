@@ -0,0 +1,119 @@
+import json
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from api.dataset import DatasetGenerator
+from foodgram.models import Recipe
+from users.models import User
+
+# Таблицы, которые растут вместе с числом пользователей и рецептов.
+# Полный просмотр небольших справочников (теги, ингредиенты) допустим.
+HOT_TABLES = {
+    'authtoken_token',
+    'foodgram_cart',
+    'foodgram_favoriterecipe',
+    'foodgram_ingredientrecipe',
+    'foodgram_recipe',
+    'foodgram_recipe_tags',
+    'users_subscription',
+    'users_user',
+}
+
+ROUTES = (
+    ('recipe-list', '/api/recipes/'),
+    ('recipe-list-author', '/api/recipes/?author={author}'),
+    ('recipe-list-tags', '/api/recipes/?tags={tag}'),
+    ('recipe-list-favorited', '/api/recipes/?is_favorited=1'),
+    ('recipe-list-cart', '/api/recipes/?is_in_shopping_cart=1'),
+    ('recipe-list-search', '/api/recipes/?search={search}'),
+    ('recipe-list-cursor', '/api/recipes/?cursor='),
+    ('recipe-detail', '/api/recipes/{recipe}/'),
+    ('user-detail', '/api/users/{author}/'),
+    ('subscriptions', '/api/users/subscriptions/?recipes_limit=3'),
+    ('download-shopping-cart',
+     '/api/recipes/download_shopping_cart/?format=json'),
+)
+
+
+def filtered_seq_scans(plan):
+    """Находит в плане полный просмотр больших таблиц с условием отбора,
+    то есть поиск, который должен был обслужить индекс."""
+
+    if (plan['Node Type'] == 'Seq Scan'
+            and plan.get('Relation Name') in HOT_TABLES
+            and 'Filter' in plan):
+        yield f'{plan["Relation Name"]}: {plan["Filter"]}'
+    for child in plan.get('Plans', ()):
+        yield from filtered_seq_scans(child)
+
+
+class Command(BaseCommand):
+    """Проверяет планы запросов основных эндпоинтов на наполненной базе.
+    Завершается ошибкой, если запрос просматривает большую таблицу
+    целиком вместо поиска по индексу. Данные откатываются после проверки."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Планы запросов проверяются на PostgreSQL.')
+        with transaction.atomic():
+            params = self.seed(options)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            failures = []
+            for route, url in ROUTES:
+                failures.extend(self.check_route(route, url.format(**params),
+                                                 params['user']))
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(
+                'Полный просмотр таблиц:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('Планы запросов в порядке'))
+
+    def check_route(self, route, url, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        with override_settings(ALLOWED_HOSTS=['testserver']), \
+                CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        if response.status_code != 200:
+            return [f'{route}: {url} вернул {response.status_code}']
+        failures = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                failures.extend(f'{route}: {scan}\n    {sql}'
+                                for scan in filtered_seq_scans(
+                                    plan[0]['Plan']))
+        self.stdout.write(f'{route}: запросов {len(queries)}')
+        return failures
+
+    def seed(self, options):
+        """Наполняет базу пользователями, рецептами и связями между ними."""
+
+        DatasetGenerator(seed=options['seed'], prefix='plan').generate(
+            users=options['users'], recipes=options['recipes'])
+        recipe = Recipe.objects.filter(
+            author__username__startswith='plan-').first()
+        user = User.objects.filter(
+            username__startswith='plan-').annotate(
+            carts=Count('cart')).order_by('-carts').first()
+        return {'user': user, 'author': recipe.author_id,
+                'recipe': recipe.pk, 'tag': recipe.tags.first().slug,
+                'search': recipe.name}
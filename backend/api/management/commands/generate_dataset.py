@@ -0,0 +1,42 @@
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from api.dataset import DEFAULT_PASSWORD, DatasetGenerator
+
+
+class Command(BaseCommand):
+    """Наполняет базу синтетическими пользователями, рецептами,
+    избранным, покупками и подписками для нагрузочных проверок."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--carts-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='dataset',
+                            help='Префикс имён создаваемых пользователей')
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        generator = DatasetGenerator(seed=options['seed'],
+                                     batch_size=options['batch_size'],
+                                     prefix=options['prefix'])
+        counts = generator.generate(
+            users=options['users'],
+            recipes=options['recipes'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+            favorites_per_user=options['favorites_per_user'],
+            carts_per_user=options['carts_per_user'],
+            subscriptions_per_user=options['subscriptions_per_user'],
+        )
+        for label, count in counts.items():
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {sum(counts.values())} '
+            f'за {perf_counter() - started:.1f} с, '
+            f'пароль пользователей: {DEFAULT_PASSWORD}'))
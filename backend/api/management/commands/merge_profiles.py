@@ -0,0 +1,49 @@
+import pstats
+from collections import defaultdict
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Объединяет профили процессов из PROFILING_DIR
+    и выводит самые затратные функции для каждого маршрута."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('routes', nargs='*',
+                            help='Маршруты, например recipes-list.get')
+        parser.add_argument('--dir', default=settings.PROFILING_DIR)
+        parser.add_argument('--sort', default='cumulative',
+                            choices=('cumulative', 'tottime', 'ncalls'))
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--save', action='store_true',
+                            help='Сохранить объединённые профили '
+                                 'в merged/<маршрут>.prof')
+
+    def handle(self, *args, **options):
+        directory = Path(options['dir'])
+        files = defaultdict(list)
+        for path in sorted(directory.glob('*.*.prof')):
+            route = path.name.rsplit('.', 2)[0]
+            files[route].append(str(path))
+        if options['routes']:
+            files = {route: paths for route, paths in files.items()
+                     if route in options['routes']}
+        if not files:
+            raise CommandError(f'Нет профилей в {directory}')
+        merged = directory / 'merged'
+        for route, paths in sorted(files.items()):
+            report = StringIO()
+            stats = pstats.Stats(*paths, stream=report)
+            self.stdout.write(self.style.SUCCESS(
+                f'{route}: процессов {len(paths)}, '
+                f'вызовов {stats.total_calls}, '
+                f'время {stats.total_tt:.3f} с'))
+            stats.strip_dirs().sort_stats(options['sort']).print_stats(
+                options['limit'])
+            self.stdout.write(report.getvalue())
+            if options['save']:
+                merged.mkdir(exist_ok=True)
+                stats.dump_stats(merged / f'{route}.prof')
@@ -0,0 +1,56 @@
+from concurrent.futures.process import BrokenProcessPool
+from time import sleep
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import DatabaseError, connections
+
+from api.exports import create_export_pool, process_pending_exports
+
+
+class Command(BaseCommand):
+    """Обрабатывает очередь выгрузок списков покупок."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=settings.SHOPPING_LIST_EXPORT_WORKERS)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Пауза между опросами очереди, секунды')
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать очередь один раз и выйти')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        executor = create_export_pool(workers)
+        try:
+            while True:
+                try:
+                    processed = process_pending_exports(executor, workers)
+                except DatabaseError as error:
+                    # База недоступна или соединение оборвалось:
+                    # обработчик не завершается, а повторяет опрос.
+                    self.stdout.write(self.style.ERROR(
+                        f'Ошибка базы данных: {error}'))
+                    connections.close_all()
+                    processed = []
+                except BrokenProcessPool as error:
+                    # Процесс пула аварийно завершился. Пул создаётся
+                    # заново, его выгрузки вернутся в очередь по истечении
+                    # SHOPPING_LIST_EXPORT_CLAIM_TIMEOUT.
+                    self.stdout.write(self.style.ERROR(
+                        f'Пул обработчиков остановлен: {error}'))
+                    executor.shutdown(wait=False)
+                    executor = create_export_pool(workers)
+                    processed = []
+                for export_id, error in processed:
+                    if error:
+                        self.stdout.write(self.style.ERROR(
+                            f'Выгрузка {export_id}: {error}'))
+                    else:
+                        self.stdout.write(f'Выгрузка {export_id} готова')
+                if options['once']:
+                    break
+                if not processed:
+                    sleep(options['interval'])
+        finally:
+            executor.shutdown()
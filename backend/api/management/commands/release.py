@@ -0,0 +1,90 @@
+import hashlib
+import shutil
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import BaseCommand, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+from api.search import is_postgres, update_search_vector
+
+STATIC_HASH_FILE = '.static-hash'
+
+
+def static_hash():
+    """Хэш исходных файлов статики всех приложений."""
+
+    digest = hashlib.sha256()
+    files = sorted(
+        (path, storage)
+        for finder in get_finders()
+        for path, storage in finder.list([])
+    )
+    for path, storage in files:
+        digest.update(path.encode())
+        with storage.open(path) as static_file:
+            for chunk in static_file.chunks():
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    """Подготовка релиза: статика, миграции, справочные данные
+    и поисковые векторы рецептов. Каждый шаг пропускается,
+    если делать нечего, и сообщает, сколько времени занял."""
+
+    steps = ('static', 'migrations', 'data', 'search')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip', nargs='+', choices=self.steps,
+                            default=[], help='Пропустить шаги')
+        parser.add_argument('--force', action='store_true',
+                            help='Выполнить шаги без проверок')
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        for step in self.steps:
+            if step in options['skip']:
+                self.stdout.write(f'{step}: пропущен')
+                continue
+            step_started = perf_counter()
+            result = getattr(self, f'release_{step}')(options['force'])
+            self.stdout.write(
+                f'{step}: {result} ({perf_counter() - step_started:.2f} с)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Релиз подготовлен за {perf_counter() - started:.2f} с'))
+
+    def release_static(self, force):
+        publish_dir = settings.STATIC_PUBLISH_DIR
+        hash_file = publish_dir / STATIC_HASH_FILE
+        current = static_hash()
+        if (not force and hash_file.exists()
+                and hash_file.read_text() == current):
+            return 'без изменений'
+        call_command('collectstatic', interactive=False, verbosity=0)
+        shutil.copytree(settings.STATIC_ROOT, publish_dir,
+                        dirs_exist_ok=True)
+        hash_file.write_text(current)
+        return 'собрана'
+
+    def release_migrations(self, force):
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plan and not force:
+            return 'без изменений'
+        call_command('migrate', interactive=False, verbosity=0)
+        return f'применено миграций: {len(plan)}'
+
+    def release_data(self, force):
+        call_command('scv_script', force=force, verbosity=0)
+        return 'проверены'
+
+    def release_search(self, force):
+        if not is_postgres():
+            return 'не используется'
+        updated = update_search_vector(missing=not force)
+        if not updated:
+            return 'без изменений'
+        return f'пересчитано векторов: {updated}'
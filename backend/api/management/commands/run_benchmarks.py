@@ -0,0 +1,261 @@
+import base64
+import json
+import platform
+import statistics
+import tempfile
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+from time import perf_counter
+
+import django
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.dataset import DatasetGenerator
+from foodgram.models import Cart, Ingredient, Recipe, Tag
+from users.models import User
+
+BUDGETS_FILE = Path(__file__).resolve().parents[2] / 'benchmark_budgets.json'
+CART_SIZE = 10
+# Бюджеты записываются отдельно для каждой СУБД: число запросов и время
+# в SQLite и PostgreSQL различаются.
+# Запас при записи бюджетов: число запросов должно совпадать точно,
+# время и память заметно колеблются между запусками.
+TIME_HEADROOM = 3
+MEMORY_HEADROOM = 2
+
+# name, метод, адрес, тело запроса, подготовка и уборка без замера.
+SCENARIOS = (
+    {'name': 'tags-list', 'url': '/api/tags/'},
+    {'name': 'tags-detail', 'url': '/api/tags/{tag}/'},
+    {'name': 'ingredients-search', 'url': '/api/ingredients/?name={prefix}'},
+    {'name': 'ingredients-detail', 'url': '/api/ingredients/{ingredient}/'},
+    {'name': 'recipes-list', 'url': '/api/recipes/'},
+    {'name': 'recipes-list-cursor', 'url': '/api/recipes/?cursor='},
+    {'name': 'recipes-list-author', 'url': '/api/recipes/?author={author}'},
+    {'name': 'recipes-list-tags', 'url': '/api/recipes/?tags={tag_slug}'},
+    {'name': 'recipes-list-favorited',
+     'url': '/api/recipes/?is_favorited=1'},
+    {'name': 'recipes-list-cart',
+     'url': '/api/recipes/?is_in_shopping_cart=1'},
+    {'name': 'recipes-list-search', 'url': '/api/recipes/?search={search}'},
+    {'name': 'recipes-detail', 'url': '/api/recipes/{recipe}/'},
+    {'name': 'recipes-create', 'method': 'post', 'url': '/api/recipes/',
+     'data': 'recipe_data', 'status': (201,)},
+    {'name': 'recipes-update', 'method': 'patch',
+     'url': '/api/recipes/{own_recipe}/', 'data': 'recipe_data'},
+    {'name': 'favorite-add', 'method': 'post',
+     'url': '/api/recipes/{recipe}/favorite/', 'status': (201,),
+     'teardown': 'delete'},
+    {'name': 'favorite-remove', 'method': 'delete',
+     'url': '/api/recipes/{recipe}/favorite/', 'status': (204,),
+     'setup': 'post'},
+    {'name': 'shopping-cart-add', 'method': 'post',
+     'url': '/api/recipes/{recipe}/shopping_cart/', 'status': (201,),
+     'teardown': 'delete'},
+    {'name': 'shopping-cart-remove', 'method': 'delete',
+     'url': '/api/recipes/{recipe}/shopping_cart/', 'status': (204,),
+     'setup': 'post'},
+    {'name': 'users-me', 'url': '/api/users/me/'},
+    {'name': 'users-detail', 'url': '/api/users/{author}/'},
+    {'name': 'subscriptions', 'url': '/api/users/subscriptions/'},
+    {'name': 'subscribe', 'method': 'post',
+     'url': '/api/users/{author}/subscribe/', 'status': (201,),
+     'teardown': 'delete'},
+    {'name': 'download-shopping-cart-txt',
+     'url': '/api/recipes/download_shopping_cart/?format=txt'},
+    {'name': 'download-shopping-cart-pdf',
+     'url': '/api/recipes/download_shopping_cart/?format=pdf',
+     'status': (200, 202)},
+)
+
+
+def image_data_url():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), 'orange').save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+class Command(BaseCommand):
+    """Замеряет эндпоинты API на синтетических данных: число запросов
+    к базе, время ответа и выделенную память. Сравнивает результаты
+    с бюджетами из benchmark_budgets.json и завершается ошибкой,
+    если бюджет превышен. Данные откатываются после замера."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--only', nargs='+', default=None,
+                            help='Замерить только указанные сценарии')
+        parser.add_argument('--budgets', default=BUDGETS_FILE)
+        parser.add_argument('--output', default=None,
+                            help='Файл для результатов в JSON')
+        parser.add_argument('--update-budgets', action='store_true',
+                            help='Записать бюджеты по результатам замера')
+
+    def handle(self, *args, **options):
+        budgets = json.loads(Path(options['budgets']).read_text()).get(
+            connection.vendor)
+        if budgets is None and not options['update_budgets']:
+            self.stderr.write(
+                f'Нет бюджетов для {connection.vendor}: проверяются только '
+                f'статусы ответов. Запишите их с --update-budgets.')
+            budgets = {}
+        scenarios = [scenario for scenario in SCENARIOS
+                     if not options['only']
+                     or scenario['name'] in options['only']]
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root,
+                                  ALLOWED_HOSTS=['testserver']), \
+                transaction.atomic():
+            DatasetGenerator(seed=options['seed'], prefix='bench').generate(
+                users=options['users'], recipes=options['recipes'])
+            client, params = self.prepare()
+            results = {
+                scenario['name']: self.measure(client, scenario, params,
+                                               options['repeat'])
+                for scenario in scenarios
+            }
+            transaction.set_rollback(True)
+
+        if options['update_budgets']:
+            budgets = self.write_budgets(options['budgets'], results)
+        regressions = [
+            f'{name}: {metric} {results[name][metric]} > {limit}'
+            for name, budget in budgets.items() if name in results
+            for metric, limit in budget.items()
+            if results[name][metric] > limit
+        ]
+        regressions.extend(f'{name}: статус {result["status"]}'
+                           for name, result in results.items()
+                           if not result['status_ok'])
+        report = json.dumps({
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'users': options['users'],
+                'recipes': options['recipes'],
+                'seed': options['seed'],
+                'repeat': options['repeat'],
+            },
+            'results': results,
+            'regressions': regressions,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(report)
+        else:
+            self.stdout.write(report)
+        if regressions:
+            raise CommandError('Превышены бюджеты:\n' + '\n'.join(regressions))
+
+    def write_budgets(self, path, results):
+        all_budgets = json.loads(Path(path).read_text())
+        budgets = all_budgets.setdefault(connection.vendor, {})
+        for name, result in results.items():
+            budgets[name] = {
+                'queries': result['queries'],
+                'time_ms': max(10, round(result['time_ms'] * TIME_HEADROOM)),
+                'memory_kb': max(
+                    100, round(result['memory_kb'] * MEMORY_HEADROOM)),
+            }
+        Path(path).write_text(
+            json.dumps(all_budgets, indent=2, sort_keys=True) + '\n')
+        return budgets
+
+    def prepare(self):
+        """Выбирает пользователя и объекты, с которыми работают сценарии."""
+
+        user = User.objects.filter(username__startswith='bench-').annotate(
+            total=Count('recipes')).order_by('-total', 'pk').first()
+        recipes = Recipe.objects.exclude(author=user).exclude(
+            favorite__user=user).exclude(cart_recipes__user=user)
+        Cart.objects.filter(user=user).delete()
+        Cart.objects.bulk_create(Cart(user=user, recipe=recipe)
+                                 for recipe in recipes[1:CART_SIZE + 1])
+        author = User.objects.filter(username__startswith='bench-').exclude(
+            pk=user.pk).exclude(authors__subscriber=user).order_by(
+            'pk').first()
+        ingredient = Ingredient.objects.order_by('pk').first()
+        tag = Tag.objects.order_by('pk').first()
+        recipe = recipes.first()
+        params = {
+            'author': author.pk,
+            'ingredient': ingredient.pk,
+            'own_recipe': user.recipes.first().pk,
+            'prefix': ingredient.name[:3],
+            'recipe': recipe.pk,
+            'search': recipe.name.split()[0],
+            'tag': tag.pk,
+            'tag_slug': tag.slug,
+            'recipe_data': {
+                'name': 'Рецепт для замера',
+                'text': 'Описание рецепта для замера',
+                'cooking_time': 30,
+                'tags': [tag.pk],
+                'ingredients': [
+                    {'id': pk, 'amount': 10}
+                    for pk in Ingredient.objects.order_by('pk').values_list(
+                        'pk', flat=True)[:5]],
+                'image': image_data_url(),
+            },
+        }
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client, params
+
+    def request(self, client, method, url, data=None):
+        response = getattr(client, method)(url, data, format='json')
+        size = (sum(len(chunk) for chunk in response.streaming_content)
+                if response.streaming else len(response.content))
+        return response, size
+
+    def measure(self, client, scenario, params, repeat):
+        """Выполняет сценарий repeat раз и один раз под tracemalloc.
+        Перед замером сценарий выполняется один раз без учёта: он заполняет
+        кэши (токенов, версий, справочников), и результат не зависит
+        от того, какие сценарии выполнялись раньше."""
+
+        method = scenario.get('method', 'get')
+        url = scenario['url'].format(**params)
+        data = params.get(scenario.get('data'))
+        timings, queries = [], []
+        for number in range(repeat + 2):
+            if 'setup' in scenario:
+                self.request(client, scenario['setup'], url)
+            warm_up = number == 0
+            traced = number == repeat + 1
+            if traced:
+                tracemalloc.start()
+            with CaptureQueriesContext(connection) as captured:
+                started = perf_counter()
+                response, size = self.request(client, method, url, data)
+                elapsed = perf_counter() - started
+            if traced:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            elif not warm_up:
+                timings.append(elapsed)
+                queries.append(len(captured))
+            if 'teardown' in scenario:
+                self.request(client, scenario['teardown'], url)
+        return {
+            'status': response.status_code,
+            'status_ok': response.status_code in scenario.get('status',
+                                                              (200,)),
+            'queries': max(queries),
+            'time_ms': round(statistics.median(timings) * 1000, 2),
+            'time_max_ms': round(max(timings) * 1000, 2),
+            'memory_kb': round(peak / 1024, 1),
+            'response_kb': round(size / 1024, 1),
+        }
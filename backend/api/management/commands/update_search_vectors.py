@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+
+from api.search import is_postgres, update_search_vector
+
+
+class Command(BaseCommand):
+    """Пересчитывает поисковые векторы всех рецептов."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true',
+                            help='Только рецепты без поискового вектора')
+
+    def handle(self, *args, **options):
+        if not is_postgres():
+            self.stdout.write(self.style.WARNING(
+                'Поисковые векторы используются только с PostgreSQL.'))
+            return
+        updated = update_search_vector(missing=options['missing'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Поисковые векторы обновлены: {updated}.'))
@@ -0,0 +1,208 @@
+import atexit
+import fcntl
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+# Границы корзин гистограммы времени ответа в секундах.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Сумма метрик завершившихся процессов.
+TOTAL_FILE = 'metrics.total.json'
+
+
+def empty_route():
+    return {
+        'requests': defaultdict(int),
+        'buckets': [0] * len(DURATION_BUCKETS),
+        'duration_sum': 0.0,
+        'count': 0,
+        'queries': 0,
+        'bytes': 0,
+    }
+
+
+class MetricsCollector:
+    """Метрики запросов одного процесса. Периодически сохраняются
+    в отдельный файл в METRICS_DIR; эндпоинт метрик суммирует файлы
+    всех процессов gunicorn."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.routes = defaultdict(empty_route)
+        self.path = Path(settings.METRICS_DIR) / (
+            f'metrics.{self.pid}.{time.time_ns()}.json')
+        self.flushed = time.monotonic()
+        atexit.register(self.close)
+
+    def observe(self, route, method, status, duration, queries):
+        metrics = self.routes[route, method]
+        metrics['requests'][str(status)] += 1
+        metrics['count'] += 1
+        metrics['duration_sum'] += duration
+        metrics['queries'] += queries
+        for number, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                metrics['buckets'][number] += 1
+                break
+        self.flush()
+
+    def observe_size(self, route, method, size):
+        self.routes[route, method]['bytes'] += size
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flushed = now
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix('.tmp')
+        temporary.write_text(json.dumps([
+            {'route': route, 'method': method, **metrics}
+            for (route, method), metrics in self.routes.items()
+        ]))
+        os.replace(temporary, self.path)
+
+    def close(self):
+        """Переносит метрики завершающегося процесса в общий файл."""
+
+        if self.pid != os.getpid():
+            return
+        self.flush(force=True)
+        with metrics_lock():
+            fold_into_total([self.path])
+        self.routes.clear()
+
+
+_collector = None
+
+
+def get_collector():
+    """Коллектор текущего процесса; после fork создаётся новый."""
+
+    global _collector
+    if _collector is None or _collector.pid != os.getpid():
+        _collector = MetricsCollector()
+    return _collector
+
+
+def read_records(paths):
+    routes = defaultdict(empty_route)
+    for path in paths:
+        try:
+            records = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        for record in records:
+            metrics = routes[record['route'], record['method']]
+            for status, count in record['requests'].items():
+                metrics['requests'][status] += count
+            for number, count in enumerate(record['buckets']):
+                metrics['buckets'][number] += count
+            for key in ('duration_sum', 'count', 'queries', 'bytes'):
+                metrics[key] += record[key]
+    return routes
+
+
+@contextmanager
+def metrics_lock():
+    """Блокировка каталога метрик на время переноса файлов в общий."""
+
+    directory = Path(settings.METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def fold_into_total(paths):
+    """Добавляет метрики из paths в TOTAL_FILE и удаляет paths.
+    Вызывается под metrics_lock."""
+
+    total = Path(settings.METRICS_DIR) / TOTAL_FILE
+    paths = [path for path in paths if path.exists()]
+    if not paths:
+        return
+    routes = read_records([total, *paths])
+    temporary = total.with_suffix('.tmp')
+    temporary.write_text(json.dumps([
+        {'route': route, 'method': method, **metrics}
+        for (route, method), metrics in routes.items()
+    ]))
+    os.replace(temporary, total)
+    for path in paths:
+        path.unlink()
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect():
+    """Суммирует метрики всех процессов. Файлы завершившихся процессов,
+    которые не успели перенести метрики сами, переносятся в общий файл,
+    чтобы каталог не рос с каждым перезапуском."""
+
+    directory = Path(settings.METRICS_DIR)
+    with metrics_lock():
+        fold_into_total([
+            path for path in directory.glob('metrics.*.json')
+            if path.name != TOTAL_FILE
+            and not is_alive(int(path.name.split('.')[1]))
+        ])
+        return read_records(directory.glob('metrics.*.json'))
+
+
+def render_prometheus(routes):
+    """Метрики в текстовом формате Prometheus."""
+
+    lines = [
+        '# HELP foodgram_http_requests_total Количество запросов.',
+        '# TYPE foodgram_http_requests_total counter',
+    ]
+    ordered = sorted(routes.items())
+    for (route, method), metrics in ordered:
+        for status, count in sorted(metrics['requests'].items()):
+            lines.append(
+                f'foodgram_http_requests_total{{route="{route}",'
+                f'method="{method}",status="{status}"}} {count}')
+    lines += [
+        '# HELP foodgram_http_request_duration_seconds Время ответа.',
+        '# TYPE foodgram_http_request_duration_seconds histogram',
+    ]
+    for (route, method), metrics in ordered:
+        labels = f'route="{route}",method="{method}"'
+        cumulative = 0
+        for bound, count in zip(DURATION_BUCKETS, metrics['buckets']):
+            cumulative += count
+            lines.append(
+                f'foodgram_http_request_duration_seconds_bucket'
+                f'{{{labels},le="{bound}"}} {cumulative}')
+        lines += [
+            f'foodgram_http_request_duration_seconds_bucket'
+            f'{{{labels},le="+Inf"}} {metrics["count"]}',
+            f'foodgram_http_request_duration_seconds_sum{{{labels}}} '
+            f'{metrics["duration_sum"]:.6f}',
+            f'foodgram_http_request_duration_seconds_count{{{labels}}} '
+            f'{metrics["count"]}',
+        ]
+    for name, key, description in (
+            ('foodgram_http_db_queries_total', 'queries',
+             'Количество запросов к базе данных.'),
+            ('foodgram_http_response_bytes_total', 'bytes',
+             'Объём ответов в байтах.')):
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+        lines += [f'{name}{{route="{route}",method="{method}"}} '
+                  f'{metrics[key]}'
+                  for (route, method), metrics in ordered]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,216 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection
+from django.urls import Resolver404, resolve
+
+from api.metrics import get_collector
+
+logger = logging.getLogger('api.timing')
+
+PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Шаблон запроса для журнала: списки параметров IN (...)
+    сворачиваются, пробелы схлопываются, длина ограничивается."""
+
+    sql = WHITESPACE.sub(' ', PLACEHOLDER_LIST.sub('(...)', sql)).strip()
+    limit = settings.REQUEST_TIMING_SQL_LOG_LENGTH
+    if len(sql) > limit:
+        sql = sql[:limit] + '…'
+    return sql
+
+
+class QueryRecorder:
+    """Обёртка выполнения SQL: запоминает шаблон и время каждого запроса."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, perf_counter() - started))
+
+    @property
+    def duration(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self, threshold):
+        """Шаблоны запросов, выполненные не меньше threshold раз:
+        обычно это запрос в цикле по объектам (N+1)."""
+
+        counts = Counter(normalize_sql(sql) for sql, _ in self.queries)
+        return [(sql, count) for sql, count in counts.most_common()
+                if count >= threshold]
+
+    def slowest(self, limit):
+        return sorted(self.queries, key=lambda query: query[1],
+                      reverse=True)[:limit]
+
+
+class RequestTimingMiddleware:
+    """Замеряет запросы к базе, сериализацию и отрисовку ответа
+    и отдаёт их в заголовке Server-Timing.
+    Замеряется доля запросов REQUEST_TIMING_SAMPLE_RATE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        request.timing = {'started': perf_counter()}
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        timing = request.timing
+        finished = perf_counter()
+        timing['total'] = finished - timing['started']
+        view = timing.get('view', timing['total'])
+        render = timing.get('rendered', finished) - timing['started'] - view
+        db = recorder.duration
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={db * 1000:.1f};desc="{len(recorder.queries)} queries"',
+            f'serialize;dur={max(view - db, 0) * 1000:.1f}',
+            f'render;dur={max(render, 0) * 1000:.1f}',
+            f'total;dur={timing["total"] * 1000:.1f}',
+        ))
+        self.report(request, recorder, timing['total'])
+        return response
+
+    def process_template_response(self, request, response):
+        """Отмечает конец работы представления; время отрисовки
+        отсчитывается до вызова post-render callback."""
+
+        timing = getattr(request, 'timing', None)
+        if timing is not None:
+            timing['view'] = perf_counter() - timing['started']
+            response.add_post_render_callback(
+                lambda response: timing.update(rendered=perf_counter()))
+        return response
+
+    def report(self, request, recorder, total):
+        for sql, count in recorder.duplicates(
+                settings.REQUEST_TIMING_DUPLICATE_THRESHOLD):
+            logger.warning('%s %s: запрос выполнен %s раз: %s',
+                           request.method, request.path, count, sql)
+        if total * 1000 < settings.REQUEST_TIMING_SLOW_MS:
+            return
+        top = '\n'.join(f'  {duration * 1000:.1f} мс: {normalize_sql(sql)}'
+                        for sql, duration in recorder.slowest(5))
+        logger.warning('Медленный запрос %s %s: %.1f мс, запросов к базе %s'
+                       '\n%s', request.method, request.path, total * 1000,
+                       len(recorder.queries), top)
+
+
+class ProfilingMiddleware:
+    """Профилирует долю запросов PROFILING_SAMPLE_RATE через cProfile.
+    Профили накапливаются по маршрутам в памяти процесса и сохраняются
+    в PROFILING_DIR в формате pstats: <маршрут>.<pid>.prof."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.profiles = {}
+        # Одновременно в процессе профилируется только один запрос.
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        if (random.random() >= settings.PROFILING_SAMPLE_RATE
+                or not request.path.startswith(settings.PROFILING_PATH_PREFIX)
+                or not self.lock.acquire(blocking=False)):
+            return self.get_response(request)
+        try:
+            route = self.route_name(request)
+            if route is None:
+                return self.get_response(request)
+            profile = self.profiles.setdefault(route, cProfile.Profile())
+            profile.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.disable()
+            self.save(route, profile)
+            return response
+        finally:
+            self.lock.release()
+
+    def route_name(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if not match.url_name:
+            return None
+        return f'{match.url_name}.{request.method.lower()}'
+
+    def save(self, route, profile):
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{route}.{os.getpid()}.prof'
+        temporary = path.with_suffix('.tmp')
+        profile.dump_stats(temporary)
+        os.replace(temporary, path)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Собирает по маршрутам число запросов, время ответа,
+    запросы к базе и объём ответов для эндпоинта метрик."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        counter = QueryCounter()
+        started = perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        match = request.resolver_match
+        route = match.url_name if match and match.url_name else 'unmatched'
+        method = request.method.lower()
+        collector = get_collector()
+        collector.observe(route, method, response.status_code,
+                          perf_counter() - started, counter.count)
+        if not response.streaming:
+            collector.observe_size(route, method, len(response.content))
+        elif response.has_header('Content-Length'):
+            # FileResponse под gunicorn отдаётся через wsgi.file_wrapper
+            # в обход streaming_content; размер файла известен заранее.
+            collector.observe_size(route, method,
+                                   int(response['Content-Length']))
+        else:
+            response.streaming_content = self.count_streamed(
+                response.streaming_content, collector, route, method)
+        return response
+
+    def count_streamed(self, content, collector, route, method):
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            collector.observe_size(route, method, size)
@@ -1,8 +1,203 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+
+COUNT_KEY = 'pagination-count:{}:{}'
+
+
+def estimate_count(queryset):
+    """Оценка количества строк по плану запроса PostgreSQL.
+    Для других баз данных возвращает None."""
+
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, который не считает COUNT(*) каждый раз.
+
+    Точное количество берётся из кэша. Если в кэше его нет,
+    для больших выборок используется оценка планировщика,
+    а точный подсчёт выполняется только для небольших выборок
+    и кэшируется на PAGINATION_COUNT_CACHE_TTL секунд. Поэтому при
+    промахе кэша небольшая выборка стоит двух запросов: EXPLAIN и COUNT.
+
+    Без count_key количество не кэшируется и не оценивается: так
+    пагинируются выборки одного пользователя, заведомо небольшие,
+    и для них выполняется только COUNT."""
+
+    def __init__(self, *args, count_key=None, **kwargs):
+        self.count_key = count_key
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def counted(self):
+        """Пара (количество, точное ли оно)."""
+
+        if self.count_key is None:
+            return super().count, True
+        count = cache.get(self.count_key)
+        if count is not None:
+            return count, True
+        estimate = estimate_count(self.object_list)
+        if (estimate is not None
+                and estimate > settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD):
+            return estimate, False
+        count = super().count
+        cache.set(self.count_key, count, settings.PAGINATION_COUNT_CACHE_TTL)
+        return count, True
+
+    @cached_property
+    def count(self):
+        return self.counted[0]
+
+    @property
+    def count_is_exact(self):
+        return self.counted[1]
+
+    def validate_number(self, number):
+        if self.count_is_exact:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не является целым числом.')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1.')
+        return number
+
+    def page(self, number):
+        if self.count_is_exact:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page],
+                              number, self)
 
 
 class LimitPagination(PageNumberPagination):
-    """Пагинатор для вывода запрошенного количества страниц."""
+    """Пагинатор для вывода запрошенного количества страниц.
+    Поле count_exact показывает, точное ли значение count."""
+
+    page_size_query_param = "limit"
+    page_size = 6
+    # Параметры, при которых количество зависит от пользователя.
+    # Такие количества не кэшируются и не оцениваются: пользователь
+    # сразу видит свои новые избранные рецепты, покупки и подписки.
+    user_scoped_params = ('is_favorited', 'is_in_shopping_cart')
+    user_scoped = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(
+            EstimatedCountPaginator,
+            count_key=self.get_count_key(request))
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_key(self, request):
+        """Ключ кэша количества по нормализованному набору фильтров
+        или None, если количество зависит от пользователя."""
+
+        ignored = (self.page_query_param, self.page_size_query_param,
+                   'cursor', 'format', 'recipes_limit')
+        params = sorted(
+            (name, sorted(request.query_params.getlist(name)))
+            for name in request.query_params if name not in ignored
+        )
+        if self.user_scoped or any(
+                name in self.user_scoped_params for name, _ in params):
+            return None
+        filters = hashlib.md5(json.dumps(params).encode()).hexdigest()
+        return COUNT_KEY.format(request.path, filters)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_exact', self.page.paginator.count_is_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_exact'] = {
+            'type': 'boolean',
+            'example': True,
+        }
+        return response_schema
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Курсорная пагинация рецептов от новых к старым.
+
+    CursorPagination строит позицию курсора только по первому полю
+    сортировки, а совпадения разрешает смещением: при сортировке
+    по pub_date рецепт с той же датой пропускался бы или повторялся.
+    id уникален и растёт вместе с pub_date, поэтому сортировка по нему."""
+
+    page_size_query_param = "limit"
+    page_size = 6
+    ordering = ('-id',)
+
+
+class SubscriptionCursorPagination(CursorPagination):
+    """Курсорная пагинация авторов в подписках."""
 
     page_size_query_param = "limit"
     page_size = 6
+    ordering = ('username', 'id')
+
+
+class LimitOrCursorPagination(BasePagination):
+    """Постраничная пагинация limit/page для прежних клиентов
+    и курсорная, если в запросе передан параметр cursor.
+    Первую страницу в курсорном режиме запрашивают с пустым cursor=.
+    С параметрами page_only_params курсор игнорируется: курсор задаёт
+    свой порядок и потерял бы, например, ранжирование поиска."""
+
+    page_class = LimitPagination
+    cursor_class = RecipeCursorPagination
+    page_only_params = ('search',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if (self.cursor_class.cursor_query_param in params
+                and not any(params.get(name)
+                            for name in self.page_only_params)):
+            self.paginator = self.cursor_class()
+        else:
+            self.paginator = self.page_class()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_class().get_paginated_response_schema(schema)
+
+
+class SubscriptionLimitPagination(LimitPagination):
+    user_scoped = True
+
+
+class SubscriptionPagination(LimitOrCursorPagination):
+    page_class = SubscriptionLimitPagination
+    cursor_class = SubscriptionCursorPagination
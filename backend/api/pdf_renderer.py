@@ -0,0 +1,104 @@
+import os
+
+import fpdf
+from fpdf import FPDF
+
+from django.conf import settings
+
+FONT_FAMILY = 'NotoSerif'
+FONT_FILE = 'NotoSerif-Italic-VariableFont_wdth,wght.ttf'
+BACKGROUND_FILE = 'background.jpg'
+ACCENT_COLOR = (255, 24, 89)
+LINK_COLOR = (42, 71, 203)
+INGREDIENTS_PER_PAGE = 14
+RECIPES_PER_PAGE = 2
+
+# Метрики шрифта хранятся в памяти процесса, файлы кэша fpdf не нужны.
+fpdf.set_global('FPDF_CACHE_MODE', 1)
+
+
+class ShoppingListPDF(FPDF):
+    """PDF документ списка покупок.
+    Разобранный шрифт и фоновое изображение загружаются
+    один раз на процесс и переиспользуются всеми документами."""
+
+    shared_fonts = {}
+    shared_images = {}
+
+    def add_font(self, family, style='', fname='', uni=False):
+        fontkey = family.lower() + style.upper()
+        shared = self.shared_fonts.get(fontkey)
+        if shared is None:
+            super().add_font(family, style, fname, uni)
+            self.shared_fonts[fontkey] = (dict(self.fonts[fontkey]),
+                                          dict(self.font_files[fontkey]))
+            return
+        font, font_file = shared
+        self.fonts[fontkey] = dict(font, i=len(self.fonts) + 1,
+                                   subset=list(range(0, 32)))
+        self.font_files[fontkey] = dict(font_file)
+        self.font_files[fname] = {'type': 'TTF'}
+
+    def shared_image(self, name, **kwargs):
+        """Вставляет изображение, разобранное один раз на процесс."""
+
+        if name not in self.images and name in self.shared_images:
+            self.images[name] = dict(self.shared_images[name],
+                                     i=len(self.images) + 1)
+        self.image(name, **kwargs)
+        self.shared_images.setdefault(name, dict(self.images[name]))
+
+    def add_background_page(self):
+        """Добавляет страницу с фоновым изображением."""
+
+        self.add_page()
+        self.shared_image(
+            os.path.join(settings.SHOPPING_LIST_PDF_ASSETS, BACKGROUND_FILE),
+            x=0, y=0, w=210, h=297)
+
+    def write_line(self, text='', size=15, color=(0, 0, 0), h=10, link=''):
+        """Выводит строку текста по центру страницы."""
+
+        self.set_font(FONT_FAMILY, size=size)
+        self.set_text_color(*color)
+        self.cell(190, h, txt=text, ln=1, align='C', link=link)
+        self.set_text_color(0, 0, 0)
+
+
+def render_shopping_list_pdf(shopping_list):
+    """Генерирует pdf файл по списку из build_shopping_list
+    и возвращает его содержимое в байтах."""
+
+    pdf = ShoppingListPDF()
+    pdf.add_font(FONT_FAMILY, style='',
+                 fname=os.path.join(settings.SHOPPING_LIST_PDF_ASSETS,
+                                    FONT_FILE),
+                 uni=True)
+    pdf.add_background_page()
+    pdf.write_line('СПИСОК ПОКУПОК', size=25, color=ACCENT_COLOR, h=20)
+    pdf.write_line('Составлен продуктовым помощником foodgram.com',
+                   color=ACCENT_COLOR, h=20)
+    pdf.write_line(h=40)
+    for number, ingredient in enumerate(shopping_list['ingredients']):
+        if number and not number % INGREDIENTS_PER_PAGE:
+            pdf.add_background_page()
+            pdf.write_line(h=80)
+        pdf.write_line(f'{ingredient["name"]} - {ingredient["amount"]}, '
+                       f'{ingredient["measurement_unit"]}')
+
+    pdf.add_background_page()
+    pdf.write_line('Из этих ингредиентов можно приготовить:', size=22,
+                   color=ACCENT_COLOR, h=20)
+    pdf.write_line(h=40)
+    for number, recipe in enumerate(shopping_list['recipes']):
+        if number and not number % RECIPES_PER_PAGE:
+            pdf.add_background_page()
+            pdf.write_line(h=60)
+        recipe_link = (f'{settings.SHOPPING_LIST_SITE_URL}'
+                       f'/recipes/{recipe["id"]}')
+        pdf.write_line(recipe['name'], size=22, color=LINK_COLOR, h=20)
+        pdf.write_line('Посмотреть рецепт на сайте -->', link=recipe_link)
+        if recipe['image']:
+            pdf.image(os.path.join(settings.MEDIA_ROOT, recipe['image']),
+                      w=50, h=50, x=85, link=recipe_link)
+    return pdf.output(dest='S').encode('latin-1')
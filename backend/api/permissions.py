@@ -14,6 +14,15 @@ class IsUserNotBanned(BasePermission):
             return False
 
 
+class IsAdmin(BasePermission):
+    """Доступ только для админов."""
+
+    def has_permission(self, request, view):
+        return bool(request.user.is_authenticated
+                    and (request.user.role == ADMIN
+                         or request.user.is_superuser))
+
+
 class IsAdminOrReadOnly(BasePermission):
     """Разрешение на изменение только для админов.
     Остальным пользователям только чтение объекта."""
@@ -0,0 +1,169 @@
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.db import connection
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from foodgram.models import IngredientRecipe, Recipe, Tag
+
+WORD_PATTERN = re.compile(r'\w+')
+# Веса полей для поиска без PostgreSQL.
+FIELD_WEIGHTS = {'name': 3, 'tags': 2, 'ingredients': 2, 'text': 1}
+MIN_TYPO_SIMILARITY = 0.75
+
+_trigram_available = None
+
+
+def is_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def trigram_available():
+    """Проверяет, установлено ли расширение pg_trgm."""
+
+    global _trigram_available
+    if _trigram_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available = cursor.fetchone() is not None
+    return _trigram_available
+
+
+def build_search_vector():
+    """Выражение tsvector рецепта: название, теги, ингредиенты, описание."""
+
+    config = settings.RECIPE_SEARCH_CONFIG
+    tags = Tag.objects.filter(
+        recipes=OuterRef('pk')
+    ).values('recipes').annotate(
+        names=StringAgg('name', ' ')
+    ).values('names')
+    ingredients = IngredientRecipe.objects.filter(
+        recipe=OuterRef('pk')
+    ).values('recipe').annotate(
+        names=StringAgg('ingredient__name', ' ')
+    ).values('names')
+    return (
+        SearchVector('name', weight='A', config=config)
+        + SearchVector(Coalesce(Subquery(tags), Value('')),
+                       weight='B', config=config)
+        + SearchVector(Coalesce(Subquery(ingredients), Value('')),
+                       weight='B', config=config)
+        + SearchVector('text', weight='C', config=config)
+    )
+
+
+def update_search_vector(recipes=None, missing=False):
+    """Пересчитывает поисковый вектор рецептов и возвращает их число.
+    recipes - id рецептов или None для всех рецептов;
+    missing - только рецепты, у которых вектора ещё нет."""
+
+    if not is_postgres():
+        return 0
+    queryset = Recipe.objects.all()
+    if recipes is not None:
+        queryset = queryset.filter(pk__in=recipes)
+    if missing:
+        queryset = queryset.filter(search_vector=None)
+    return queryset.update(search_vector=build_search_vector())
+
+
+def postgres_search(queryset, query):
+    """Полнотекстовый поиск с ранжированием
+    и поиском по триграммам названия для опечаток."""
+
+    search_query = SearchQuery(query, config=settings.RECIPE_SEARCH_CONFIG,
+                               search_type='websearch')
+    # Рецепт без вектора (ещё не пересчитанный) получает нулевой ранг,
+    # иначе NULL оказался бы в начале сортировки по убыванию.
+    queryset = queryset.annotate(search_rank=Coalesce(
+        SearchRank(F('search_vector'), search_query), Value(0.0)))
+    if not trigram_available():
+        return queryset.filter(search_vector=search_query).order_by(
+            '-search_rank', '-pub_date', '-id')
+    # trigram_similar (оператор %) в отличие от сравнения similarity
+    # с порогом использует триграммный GIN-индекс по названию.
+    return queryset.annotate(
+        similarity=TrigramSimilarity('name', query)
+    ).filter(
+        Q(search_vector=search_query) | Q(name__trigram_similar=query)
+    ).order_by(
+        (F('search_rank') + F('similarity')).desc(), '-pub_date', '-id')
+
+
+def words(text):
+    return WORD_PATTERN.findall(text.casefold())
+
+
+def word_score(query_word, document_words):
+    """Насколько слово запроса совпадает со словами документа:
+    полное совпадение, начало слова или слово с опечаткой."""
+
+    best = 0
+    for word in document_words:
+        if word == query_word:
+            return 1
+        if word.startswith(query_word):
+            best = max(best, 0.8)
+        elif abs(len(word) - len(query_word)) <= 2:
+            similarity = SequenceMatcher(None, query_word, word).ratio()
+            if similarity >= MIN_TYPO_SIMILARITY:
+                best = max(best, similarity * 0.6)
+    return best
+
+
+def python_search(queryset, query):
+    """Поиск без PostgreSQL: ранжирует рецепты в памяти процесса.
+    Предназначен для SQLite в тестах и небольших наборов данных."""
+
+    query_words = words(query)
+    if not query_words:
+        return queryset.none()
+    documents = {
+        recipe['pk']: {'name': words(recipe['name']),
+                       'text': words(recipe['text']),
+                       'tags': [], 'ingredients': []}
+        for recipe in queryset.values('pk', 'name', 'text')
+    }
+    related = defaultdict(list)
+    for recipe_id, name in Recipe.tags.through.objects.filter(
+            recipe__in=documents).values_list('recipe', 'tag__name'):
+        related[recipe_id, 'tags'].extend(words(name))
+    for recipe_id, name in IngredientRecipe.objects.filter(
+            recipe__in=documents).values_list('recipe', 'ingredient__name'):
+        related[recipe_id, 'ingredients'].extend(words(name))
+    for (recipe_id, field), field_words in related.items():
+        documents[recipe_id][field] = field_words
+
+    scores = {}
+    for recipe_id, document in documents.items():
+        score = 0
+        for query_word in query_words:
+            word_best = max(
+                FIELD_WEIGHTS[field] * word_score(query_word, field_words)
+                for field, field_words in document.items())
+            if not word_best:
+                break
+            score += word_best
+        else:
+            scores[recipe_id] = score
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return queryset.filter(pk__in=ranked).order_by(
+        Case(*(When(pk=pk, then=Value(position))
+               for position, pk in enumerate(ranked))))
+
+
+def search_recipes(queryset, query):
+    """Ищет рецепты по названию, описанию, тегам и ингредиентам
+    и упорядочивает их по релевантности."""
+
+    if is_postgres():
+        return postgres_search(queryset, query)
+    return python_search(queryset, query)
@@ -1,15 +1,20 @@
-import base64
-
 from django.contrib.auth.hashers import make_password
-from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
-from api.utils import create_recipe_ingredients, ReadOnlyFieldsMixin
+from api.images import decode_base64_image
+from api.search import update_search_vector
+from api.utils import (create_recipe_ingredients, create_recipe_tags,
+                       get_recipes_limit, update_recipe_ingredients,
+                       update_recipe_tags, ReadOnlyFieldsMixin)
 from api.validators import ingredients_validator, tags_validator
 from foodgram.models import (Cart, FavoriteRecipe, Ingredient,
-                             Recipe, Tag, IngredientRecipe)
+                             Recipe, ShoppingListExport, Tag,
+                             IngredientRecipe)
+from foodgram.images import VARIANT_FIELDS
 from users.models import Subscription, User
 
 
@@ -42,6 +47,8 @@ class UserSerializer(serializers.ModelSerializer):
     def get_is_subscribed(self, author_recipe) -> bool:
         """Определяет подписан ли пользователь на автора рецепта."""
 
+        if hasattr(author_recipe, 'is_subscribed'):
+            return author_recipe.is_subscribed
         request = self.context.get('request')
         if not request:
             return False
@@ -56,13 +63,47 @@ class TagSerializer(ReadOnlyFieldsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Tag
-        fields = '__all__'
+        fields = ('id', 'name', 'color', 'slug')
+
+
+class ImageVariantField(serializers.ImageField):
+    """Отдаёт ссылку на уменьшенную копию изображения рецепта.
+    Для списков используется list_variant, иначе variant."""
+
+    def __init__(self, variant=None, list_variant=None, **kwargs):
+        self.variant = variant
+        self.list_variant = list_variant or variant
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if value:
+            view = self.context.get('view')
+            variant = (self.list_variant
+                       if getattr(view, 'action', None) == 'list'
+                       else self.variant)
+            variant_file = getattr(value.instance,
+                                   VARIANT_FIELDS.get(variant, ''), None)
+            if variant_file:
+                value = variant_file
+        return super().to_representation(value)
+
+
+class Base64ImageField(ImageVariantField):
+    """Декодирует изображение из base64."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('data:image'):
+            data = decode_base64_image(data)
+
+        return super().to_internal_value(data)
 
 
 class ShortRecipeSerializer(ReadOnlyFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для модели Recipe
     c укороченным набор полей"""
 
+    image = ImageVariantField(variant='thumbnail')
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
@@ -71,7 +112,7 @@ class ShortRecipeSerializer(ReadOnlyFieldsMixin, serializers.ModelSerializer):
 class UserSubscribeSerializer(ReadOnlyFieldsMixin, UserSerializer):
     """Сериализатор для вывода авторов на которых подписан  пользователь."""
 
-    recipes = ShortRecipeSerializer(many=True, read_only=True)
+    recipes = serializers.SerializerMethodField()
     recipes_count = serializers.SerializerMethodField()
 
     class Meta:
@@ -87,9 +128,24 @@ class UserSubscribeSerializer(ReadOnlyFieldsMixin, UserSerializer):
             'recipes_count',
         )
 
+    def get_recipes(self, author_recipe):
+        """Отображает последние рецепты автора с учётом recipes_limit."""
+
+        if hasattr(author_recipe, 'latest_recipes'):
+            recipes = author_recipe.latest_recipes
+        else:
+            limit = get_recipes_limit(self.context.get('request'))
+            recipes = author_recipe.recipes.order_by('-pub_date', '-pk')
+            if limit is not None:
+                recipes = recipes[:limit]
+        return ShortRecipeSerializer(recipes, many=True,
+                                     context=self.context).data
+
     def get_recipes_count(self, author_recipe) -> int:
         """Отображает общее количество рецептов у каждого автора."""
 
+        if hasattr(author_recipe, 'recipes_count'):
+            return author_recipe.recipes_count
         return author_recipe.recipes.count()
 
 
@@ -101,19 +157,6 @@ class IngredientSerializer(ReadOnlyFieldsMixin, serializers.ModelSerializer):
         fields = '__all__'
 
 
-class Base64ImageField(serializers.ImageField):
-    """Декодирует изображение из base64."""
-
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
-
-        return super().to_internal_value(data)
-
-
 class IngredientInRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор ингредиентов для работы с рецептами."""
 
@@ -135,7 +178,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField(required=False)
+    image = Base64ImageField(required=False, variant='detail',
+                             list_variant='thumbnail')
     ingredients = IngredientInRecipeSerializer(many=True, read_only=True,
                                                source='recipe')
 
@@ -158,9 +202,23 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_shopping_cart',
         )
 
+    def to_representation(self, recipe):
+        # После создания или изменения рецепта кэш prefetch_related
+        # пуст: загружаем теги и ингредиенты двумя запросами.
+        prefetched = getattr(recipe, '_prefetched_objects_cache', {})
+        if not {'tags', 'recipe'} <= prefetched.keys():
+            prefetch_related_objects([recipe], 'tags', Prefetch(
+                'recipe', queryset=IngredientRecipe.objects.select_related(
+                    'ingredient')))
+        if hasattr(recipe, 'author_is_subscribed'):
+            recipe.author.is_subscribed = recipe.author_is_subscribed
+        return super().to_representation(recipe)
+
     def get_is_in_shopping_cart(self, recipe):
         """Проверяет находится ли рецепт в списке  покупок."""
 
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return request.user.cart.filter(recipe=recipe).exists()
@@ -169,6 +227,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     def get_is_favorited(self, recipe):
         """Проверяет находится ли рецепт в избранном."""
 
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
         request = self.context.get('request')
         if (request and hasattr(request, 'user')
                 and request.user.is_authenticated):
@@ -187,27 +247,34 @@ class RecipeSerializer(serializers.ModelSerializer):
                      'ingredients': ingredients, 'tags': tags})
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         """Создаёт рецепт."""
 
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(**validated_data)
+        recipe = Recipe.objects.create(
+            **validated_data, tag_ids=Recipe.tag_ids_of(tags))
         create_recipe_ingredients(recipe, ingredients)
-        recipe.tags.set(tags)
+        create_recipe_tags(recipe, tags)
+        update_search_vector([recipe.pk])
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
-        """Обновляет рецепт."""
+        """Обновляет рецепт: меняет только изменившиеся теги
+        и ингредиенты и сохраняет рецепт один раз."""
 
         tags = validated_data.pop('tags')
-        recipe.tags.clear()
-        recipe.tags.set(tags)
         ingredients = validated_data.pop('ingredients')
-        recipe.ingredients.clear()
-        create_recipe_ingredients(recipe, ingredients)
-        super().update(recipe, validated_data)
+        validated_data.pop('author', None)
+        for field, value in validated_data.items():
+            setattr(recipe, field, value)
+        recipe.tag_ids = Recipe.tag_ids_of(tags)
         recipe.save()
+        update_recipe_tags(recipe, tags)
+        update_recipe_ingredients(recipe, ingredients)
+        update_search_vector([recipe.pk])
         return recipe
 
 
@@ -278,3 +345,11 @@ class SubscribeSerializer(serializers.ModelSerializer):
             subscription.author,
             context={'request': request})
         return serializer.data
+
+
+class ShoppingListExportSerializer(serializers.ModelSerializer):
+    """Сериализатор статуса выгрузки списка покупок."""
+
+    class Meta:
+        model = ShoppingListExport
+        fields = ('id', 'status', 'created')
@@ -0,0 +1,105 @@
+import csv
+import json
+from urllib.parse import quote
+
+from django.db.models import F, Sum
+from django.http import StreamingHttpResponse
+
+from foodgram.models import IngredientRecipe, Recipe
+
+CSV_HEADER = ('name', 'measurement_unit', 'amount')
+FILENAME = 'Список покупок'
+
+
+def iter_ingredients(user):
+    """Построчно отдаёт ингредиенты списка покупок,
+    по одному словарю name, measurement_unit, amount
+    на каждую пару ингредиент - единица измерения."""
+
+    rows = IngredientRecipe.objects.filter(
+        recipe__cart_recipes__user=user
+    ).values(
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
+    ).annotate(
+        total_amount=Sum('amount')
+    ).order_by('name', 'measurement_unit')
+    for row in rows.iterator():
+        yield {'name': row['name'],
+               'measurement_unit': row['measurement_unit'],
+               'amount': row['total_amount']}
+
+
+def build_shopping_list(user):
+    """Собирает список покупок пользователя за два запроса.
+
+    Возвращает словарь с ключами:
+    ingredients - список словарей name, measurement_unit, amount,
+    по одному на каждую пару ингредиент - единица измерения;
+    recipes - список словарей id, name, image рецептов из корзины,
+    где image - уменьшенная для pdf копия изображения, если она есть.
+    """
+
+    ingredients = list(iter_ingredients(user))
+    recipes = [
+        {'id': recipe['id'], 'name': recipe['name'],
+         'image': recipe['image_pdf'] or recipe['image']}
+        for recipe in Recipe.objects.filter(
+            cart_recipes__user=user
+        ).order_by('name', 'id').values('id', 'name', 'image', 'image_pdf')
+    ]
+    return {'ingredients': ingredients, 'recipes': recipes}
+
+
+def stream_text(ingredients):
+    """Список покупок в виде простого текста."""
+
+    yield 'Список покупок\n\n'
+    for ingredient in ingredients:
+        yield (f'{ingredient["name"]} ({ingredient["measurement_unit"]})'
+               f' - {ingredient["amount"]}\n')
+
+
+class Echo:
+    """Буфер, который сразу возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(ingredients):
+    """Список покупок в формате CSV."""
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for ingredient in ingredients:
+        yield writer.writerow(ingredient[column] for column in CSV_HEADER)
+
+
+def stream_json(ingredients):
+    """Список покупок в виде JSON массива."""
+
+    yield '['
+    for number, ingredient in enumerate(ingredients):
+        yield (',' if number else '') + json.dumps(ingredient,
+                                                   ensure_ascii=False)
+    yield ']'
+
+
+STREAM_FORMATS = {
+    'txt': (stream_text, 'text/plain; charset=utf-8'),
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'json': (stream_json, 'application/json'),
+}
+
+
+def stream_shopping_list(user, file_format):
+    """Отдаёт список покупок потоком в одном из STREAM_FORMATS,
+    не загружая все строки в память."""
+
+    stream, content_type = STREAM_FORMATS[file_format]
+    response = StreamingHttpResponse(stream(iter_ingredients(user)),
+                                     content_type=content_type)
+    response['Content-Disposition'] = (
+        f"attachment; filename*=utf-8''{quote(FILENAME)}.{file_format}")
+    return response
@@ -0,0 +1,117 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_user
+from api.cache import bump_data_version
+from api.search import is_postgres, update_search_vector
+from foodgram.models import Ingredient, Recipe, Tag
+from users.models import User
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(**kwargs):
+    """Обновляет версию данных ингредиентов после их изменения."""
+
+    bump_data_version('ingredients')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(**kwargs):
+    """Обновляет версию данных тегов после их изменения."""
+
+    bump_data_version('tags')
+
+
+# Связь рецепта с моделями, названия которых входят в поисковый вектор.
+SEARCH_RELATIONS = {Tag: 'tags', Ingredient: 'ingredients'}
+
+
+def search_recipes_ids(sender, instance):
+    return list(Recipe.objects.filter(
+        **{SEARCH_RELATIONS[sender]: instance}).values_list('pk', flat=True))
+
+
+@receiver(pre_save, sender=Tag)
+@receiver(pre_save, sender=Ingredient)
+def search_name_changing(sender, instance, **kwargs):
+    """Запоминает, меняется ли название тега или ингредиента."""
+
+    instance._name_changed = (
+        is_postgres() and instance.pk is not None
+        and sender.objects.filter(pk=instance.pk).exclude(
+            name=instance.name).exists())
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def search_name_changed(sender, instance, **kwargs):
+    """Пересчитывает поисковые векторы рецептов
+    после переименования их тега или ингредиента."""
+
+    if getattr(instance, '_name_changed', False):
+        update_search_vector(search_recipes_ids(sender, instance))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def related_recipes_deleting(sender, instance, **kwargs):
+    """Запоминает рецепты удаляемого тега или ингредиента:
+    после удаления связей их уже не найти."""
+
+    if is_postgres():
+        instance._recipe_ids = search_recipes_ids(sender, instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def search_name_deleted(sender, instance, **kwargs):
+    """Убирает название удалённого тега или ингредиента
+    из поисковых векторов рецептов."""
+
+    if getattr(instance, '_recipe_ids', None):
+        update_search_vector(instance._recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    """Пересчитывает tag_ids рецептов после изменения их тегов."""
+
+    if not is_postgres():
+        return
+    if reverse and action == 'pre_clear':
+        instance._cleared_recipes = list(
+            instance.recipes.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        recipes = Recipe.objects.filter(pk=instance.pk)
+    elif action == 'post_clear':
+        recipes = Recipe.objects.filter(pk__in=instance._cleared_recipes)
+    else:
+        recipes = Recipe.objects.filter(pk__in=pk_set)
+    recipes.sync_tag_ids()
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(instance, **kwargs):
+    """Убирает id удалённого тега из tag_ids его рецептов."""
+
+    if getattr(instance, '_recipe_ids', None):
+        Recipe.objects.filter(pk__in=instance._recipe_ids).sync_tag_ids()
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_changed(instance, **kwargs):
+    """Сбрасывает кэш токенов пользователя после смены роли,
+    блокировки или удаления."""
+
+    transaction.on_commit(lambda: invalidate_user(instance.pk))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_user(instance.user_id))
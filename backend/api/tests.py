@@ -0,0 +1,266 @@
+from io import StringIO
+from unittest import skipIf, skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.search import search_recipes, update_search_vector
+from foodgram.models import (Cart, FavoriteRecipe, Ingredient,
+                             IngredientRecipe, Recipe, Tag)
+from users.models import User
+
+
+class RecipeListQueriesTest(TestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user', email='u@foodgram.com')
+        author = User.objects.create(username='author',
+                                     email='a@foodgram.com')
+        tag = Tag.objects.create(name='Завтрак', slug='breakfast',
+                                 color='#E26C2D')
+        ingredient = Ingredient.objects.create(name='Соль',
+                                               measurement_unit='г')
+        for number in range(30):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', text='Описание', cooking_time=10,
+                author=author)
+            recipe.tags.add(tag)
+            IngredientRecipe.objects.create(recipe=recipe,
+                                            ingredient=ingredient, amount=5)
+            FavoriteRecipe.objects.create(user=cls.user, recipe=recipe)
+            Cart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_page_size(self):
+        for url in ('/api/recipes/?limit={}',
+                    '/api/recipes/?limit={}&is_favorited=1',
+                    '/api/recipes/?limit={}&is_in_shopping_cart=1'):
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url.format(5)),
+                                 self.count_queries(url.format(25)))
+
+
+class RecipeUpdateQueriesTest(TestCase):
+    """Изменение рецепта затрагивает только изменившиеся строки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user', email='u@foodgram.com')
+        cls.tags = [Tag.objects.create(name=f'Тег {number}',
+                                       slug=f'tag-{number}',
+                                       color=f'#00000{number}')
+                    for number in range(2)]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(3)]
+        cls.recipe = Recipe.objects.create(
+            name='Рецепт', text='Описание', cooking_time=10, author=cls.user)
+        cls.recipe.tags.add(*cls.tags)
+        for ingredient in cls.ingredients:
+            IngredientRecipe.objects.create(recipe=cls.recipe,
+                                            ingredient=ingredient, amount=5)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+        self.data = {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'tags': [tag.pk for tag in self.tags],
+            'ingredients': [{'id': ingredient.pk, 'amount': 5}
+                            for ingredient in self.ingredients],
+        }
+
+    def patch_recipe(self, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return queries
+
+    def count_unchanged(self):
+        """Запросы изменения без изменений: связи не переписываются."""
+
+        queries = self.patch_recipe(self.data)
+        link_tables = (IngredientRecipe._meta.db_table,
+                       Recipe.tags.through._meta.db_table)
+        writes = [query['sql'] for query in queries
+                  if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+                  and any(table in query['sql'] for table in link_tables)]
+        self.assertEqual(writes, [])
+        return len(queries)
+
+    def test_text_only_edit(self):
+        unchanged = self.count_unchanged()
+        link_ids = set(IngredientRecipe.objects.values_list('pk', flat=True))
+        self.data['text'] = 'Новое описание'
+        with self.assertNumQueries(unchanged):
+            self.client.patch(self.url, self.data, format='json')
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.text, 'Новое описание')
+        self.assertEqual(
+            set(IngredientRecipe.objects.values_list('pk', flat=True)),
+            link_ids)
+
+    def test_one_ingredient_changed(self):
+        unchanged = self.count_unchanged()
+        self.data['ingredients'][1]['amount'] = 7
+        # Одно изменение количества - один дополнительный UPDATE.
+        with self.assertNumQueries(unchanged + 1):
+            self.client.patch(self.url, self.data, format='json')
+        self.assertEqual(
+            IngredientRecipe.objects.get(
+                recipe=self.recipe, ingredient=self.ingredients[1]).amount,
+            7)
+
+
+class MigrationsTest(TestCase):
+    """Миграции в репозитории соответствуют моделям."""
+
+    def test_no_missing_migrations(self):
+        call_command('makemigrations', check=True, dry_run=True,
+                     verbosity=0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Планы запросов PostgreSQL.')
+class QueryPlansTest(TestCase):
+    """Основные эндпоинты не просматривают большие таблицы целиком."""
+
+    def test_query_plans(self):
+        # На небольшой тестовой базе планировщик предпочёл бы полный
+        # просмотр таблиц, поэтому он запрещается: оставшиеся Seq Scan
+        # означают, что подходящего индекса нет.
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        call_command('check_query_plans', recipes=300, users=50,
+                     stdout=StringIO())
+
+
+class RecipeSearchTest(TestCase):
+    """Поиск рецептов упорядочивает результаты по релевантности."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author',
+                                     email='a@foodgram.com')
+        cls.tag = Tag.objects.create(name='Обед', slug='lunch',
+                                     color='#E26C2D')
+        beet = Ingredient.objects.create(name='Свёкла',
+                                         measurement_unit='г')
+        cls.by_name = Recipe.objects.create(
+            name='Борщ украинский', text='Описание', cooking_time=60,
+            author=author)
+        cls.by_text = Recipe.objects.create(
+            name='Первое блюдо', text='Подаём борщ со сметаной',
+            cooking_time=60, author=author)
+        cls.other = Recipe.objects.create(
+            name='Оладьи', text='Описание', cooking_time=20, author=author)
+        for recipe in (cls.by_name, cls.by_text):
+            recipe.tags.add(cls.tag)
+            IngredientRecipe.objects.create(recipe=recipe, ingredient=beet,
+                                            amount=300)
+        update_search_vector()
+
+    def search(self, query):
+        return list(search_recipes(Recipe.objects.all(), query))
+
+    def test_name_ranked_above_text(self):
+        self.assertEqual(self.search('борщ'), [self.by_name, self.by_text])
+
+    def test_tags_and_ingredients(self):
+        self.assertEqual(set(self.search('свёкла')),
+                         {self.by_name, self.by_text})
+        self.assertEqual(set(self.search('обед')),
+                         {self.by_name, self.by_text})
+
+    def test_no_match(self):
+        self.assertEqual(self.search('пицца'), [])
+
+    def test_api(self):
+        response = APIClient().get('/api/recipes/', {'search': 'борщ'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([recipe['id'] for recipe in response.data['results']],
+                         [self.by_name.pk, self.by_text.pk])
+
+    @skipIf(connection.vendor == 'postgresql', 'Поиск без PostgreSQL.')
+    def test_typo(self):
+        self.assertEqual(self.search('борш'), [self.by_name, self.by_text])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Поиск PostgreSQL.')
+    def test_missing_vector_ranked_as_zero(self):
+        Recipe.objects.filter(pk=self.by_name.pk).update(search_vector=None)
+        ranks = [recipe.search_rank for recipe in search_recipes(
+            Recipe.objects.all(), 'борщ')]
+        self.assertNotIn(None, ranks)
+        self.assertEqual(update_search_vector(missing=True), 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Поиск PostgreSQL.')
+    def test_tag_rename_updates_vectors(self):
+        self.tag.name = 'Ужин'
+        self.tag.save()
+        self.assertEqual(set(self.search('ужин')),
+                         {self.by_name, self.by_text})
+        self.assertEqual(self.search('обед'), [])
+
+
+class RecipeTagFilterTest(TestCase):
+    """Фильтр по тегам находит рецепты хотя бы с одним из тегов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author',
+                                     email='a@foodgram.com')
+        cls.tags = [Tag.objects.create(name=f'Тег {number}',
+                                       slug=f'tag-{number}',
+                                       color=f'#00000{number}')
+                    for number in range(3)]
+        cls.recipes = []
+        for number, tag in enumerate(cls.tags):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', text='Описание', cooking_time=10,
+                author=author)
+            recipe.tags.add(tag)
+            cls.recipes.append(recipe)
+
+    def filter_ids(self, *slugs):
+        response = APIClient().get('/api/recipes/', {'tags': slugs})
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_any_tag(self):
+        self.assertEqual(self.filter_ids('tag-0', 'tag-2'),
+                         {self.recipes[0].pk, self.recipes[2].pk})
+
+    def test_tags_changed(self):
+        self.recipes[1].tags.add(self.tags[0])
+        self.tags[2].recipes.clear()
+        self.assertEqual(self.filter_ids('tag-0', 'tag-2'),
+                         {self.recipes[0].pk, self.recipes[1].pk})
+        self.tags[0].delete()
+        self.assertEqual(self.filter_ids('tag-1'), {self.recipes[1].pk})
+
+    @skipUnless(connection.vendor == 'postgresql', 'Массив тегов PostgreSQL.')
+    def test_filter_without_join(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.filter_ids('tag-0')
+        sql = [query['sql'] for query in queries]
+        self.assertTrue(any('&&' in query for query in sql))
+        self.assertFalse(any('DISTINCT' in query for query in sql))
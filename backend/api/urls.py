@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
-from api.views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from api.views import (IngredientViewSet, MetricsView, RecipeViewSet,
+                       TagViewSet, UserViewSet)
 
 
 app_name = "api"
@@ -14,4 +15,5 @@ router.register("users", UserViewSet, "users")
 urlpatterns = (
     path("", include(router.urls)),
     path("auth/", include("djoser.urls.authtoken")),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
 )
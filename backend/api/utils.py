@@ -1,12 +1,7 @@
-from fpdf import FPDF
-
-from django.db.models import Sum
-from django.shortcuts import HttpResponse
-
 from rest_framework import status
 from rest_framework.response import Response
 
-from foodgram.models import IngredientRecipe
+from foodgram.models import IngredientRecipe, Recipe
 
 
 def create_recipe_ingredients(recipe, ingredients):
@@ -22,107 +17,66 @@ def create_recipe_ingredients(recipe, ingredients):
     IngredientRecipe.objects.bulk_create(recipe_ingredients)
 
 
-def add_page_to_pdf(pdf):
-    """Добавляет страницу в pdf файл."""
-
-    pdf.add_page()
-    pdf.image('/app/api/pdf/background.jpg', x=0, y=0, w=210, h=297)
-    return pdf
-
-
-def set_pdf_text(pdf, new_size=15, text='', r=0, g=0, b=0, border=False, w=190,
-                 h=20):
-    """Настраивает отображение текста в pdf файле."""
-
-    pdf.set_font('NotoSerif', size=new_size)
-    pdf.set_text_color(r, g, b)
-    pdf.cell(w, h, txt=text,
-             ln=1, align='C', border=border)
-    pdf.set_text_color(0, 0, 0)
-    pdf.set_font('NotoSerif', size=15)
-    return pdf
-
-
-def generate_pdf_file(ingredients):
-    """Генерирует pdf файл."""
-
-    pdf = FPDF()
-    pdf = add_page_to_pdf(pdf)
-    font = 'NotoSerif-Italic-VariableFont_wdth,wght.ttf'
-    pdf.add_font('NotoSerif', style='',
-                 fname=f'/app/api/pdf/{font}',
-                 uni=True)
-
-    pdf = set_pdf_text(
-        pdf, 25, text='СПИСОК ПОКУПОК', r=255, g=24, b=89)
-    pdf = set_pdf_text(
-        pdf, 15, text='Составлен продуктовым помощником foodgram.com', r=255,
-        g=24, b=89)
-    recipe_images = {}
-    pdf.cell(190, 40, txt='', ln=1, align='C')
-    ingredient_counter = 0
-    for ingredient in ingredients:
-        if ingredient_counter == 14:
-            pdf = add_page_to_pdf(pdf)
-            pdf.cell(190, 80, txt='', ln=1, align='C')
-            ingredient_counter = 0
-        recipe_name = ingredient['recipe__name']
-        image = ingredient['recipe__image']
-        recipe_id = ingredient['recipe__id']
-
-        if image not in recipe_images.values():
-            recipe_images[recipe_name] = [image, recipe_id]
-
-        name = ingredient['ingredient__name']
-        unit = ingredient['ingredient__measurement_unit']
-        amount = ingredient['ingredient_amount']
-        pdf.cell(190, 10, txt=f'{name} - {amount}, {unit}',
-                 ln=1, align='C')
-        ingredient_counter += 1
-    pdf = add_page_to_pdf(pdf)
-    pdf = set_pdf_text(
-        pdf, 22, text='Из этих ингредиентов можно приготовить:', r=255, g=24,
-        b=89)
-    pdf.cell(190, 40, txt='', ln=1, align='C')
-    recipes_counter = 0
-    for recipe_name, data in recipe_images.items():
-
-        if recipes_counter == 2:
-            pdf = add_page_to_pdf(pdf)
-            pdf.cell(190, 60, txt='', ln=1, align='C')
-            recipes_counter = 0
-        image, recipe_id = data
-        recipe_link = f'http://localhost/recipes/{recipe_id}'
-
-        pdf = set_pdf_text(
-            pdf, 22, text=recipe_name, r=42, g=71, b=203)
-
-        pdf.cell(190, 10, txt='Посмотреть рецепт на сайте -->',
-                 ln=1, align='C', link=recipe_link)
-        pdf.image(f'/app/media/{image}', w=50, h=50, x=85,
-                  type='', link=recipe_link)
-        recipes_counter += 1
-
-    pdf.output(name='Список покупок.pdf')
-    pdf = pdf.output(dest='S').encode('latin-1')
-    return pdf
-
-
-def create_shoping_list(user):
-    """Формирует список ингредиентов для покупки."""
-
-    ingredients = IngredientRecipe.objects.filter(
-        recipe__cart_recipes__user=user
-    ).values(
-        'ingredient__name', 'ingredient__measurement_unit',
-        'recipe__image', 'recipe__name', 'recipe__id'
-    ).annotate(ingredient_amount=Sum('amount'))
-    pdf = generate_pdf_file(ingredients)
-    response = HttpResponse(pdf,
-                            content_type='application/pdf')
-    response[
-        'Content-Disposition'] = 'attachment; filename="Список покупок.pdf"'
-    return response
+def create_recipe_tags(recipe, tags):
+    """Связывает рецепт с тегами одной вставкой без сигналов m2m_changed:
+    массив tag_ids задаёт вызывающий код."""
+
+    RecipeTag = Recipe.tags.through
+    RecipeTag.objects.bulk_create(
+        RecipeTag(recipe=recipe, tag=tag) for tag in tags)
+
+
+def update_recipe_tags(recipe, tags):
+    """Добавляет и удаляет только изменившиеся теги рецепта.
+    Массив tag_ids задаёт вызывающий код."""
+
+    current = {tag.pk for tag in recipe.tags.all()}
+    submitted = {tag.pk: tag for tag in tags}
+    removed = current - submitted.keys()
+    if removed:
+        Recipe.tags.through.objects.filter(
+            recipe=recipe, tag__in=removed).delete()
+    create_recipe_tags(recipe, [tag for pk, tag in submitted.items()
+                                if pk not in current])
+
+
+def update_recipe_ingredients(recipe, ingredients):
+    """Сравнивает ингредиенты рецепта с переданными
+    и выполняет только нужные вставки, изменения количества и удаления."""
+
+    current = {item.ingredient_id: item for item in recipe.recipe.all()}
+    submitted = {ingredient.pk: (ingredient, amount)
+                 for ingredient, amount in ingredients.values()}
+    created, changed = [], []
+    for ingredient_id, (ingredient, amount) in submitted.items():
+        item = current.get(ingredient_id)
+        if item is None:
+            created.append(IngredientRecipe(recipe=recipe,
+                                            ingredient=ingredient,
+                                            amount=amount))
+        elif item.amount != amount:
+            item.amount = amount
+            changed.append(item)
+    removed = [item.pk for ingredient_id, item in current.items()
+               if ingredient_id not in submitted]
+    if removed:
+        IngredientRecipe.objects.filter(pk__in=removed).delete()
+    if changed:
+        IngredientRecipe.objects.bulk_update(changed, ['amount'])
+    if created:
+        IngredientRecipe.objects.bulk_create(created)
+
+
+def get_recipes_limit(request):
+    """Возвращает значение параметра recipes_limit из запроса."""
+
+    if request is None:
+        return None
+    try:
+        limit = int(request.query_params.get('recipes_limit'))
+    except (TypeError, ValueError):
+        return None
+    return limit if limit >= 0 else None
 
 
 def add_recipe(request, recipe, serializer_name):
@@ -15,39 +15,44 @@ def password_validator(request):
     return new_password
 
 
-def ingredients_validator(ingredients):
-    """Проверяет корректность указанных ингредиентов."""
+def parse_ids(values, message):
+    """Приводит идентификаторы к int, сохраняя порядок и убирая повторы."""
+
+    try:
+        return list(dict.fromkeys(int(value) for value in values))
+    except (TypeError, ValueError):
+        raise ValidationError(message)
 
-    ingredient_ids = []
-    ingredient_amount = []
+
+def ingredients_validator(ingredients):
+    """Проверяет корректность указанных ингредиентов.
+    Возвращает словарь id -> (ингредиент, количество); количества
+    повторяющихся ингредиентов складываются."""
 
     if not ingredients:
         raise ValidationError('Не указаны ингредиенты')
 
+    amounts = {}
     for ingredient in ingredients:
         try:
-            amount = int(ingredient['amount'])
-        except ValueError:
+            ingredient_id, amount = ingredient['id'], ingredient['amount']
+        except (KeyError, TypeError):
+            raise ValidationError('Некорректный ингредиент')
+        try:
+            amount = int(amount)
+        except (TypeError, ValueError):
             raise ValidationError(
                 'Количество ингредиента - должно быть числовым значением!')
-        except KeyError:
-            raise ValidationError('Некорректный ингредиент')
         if amount <= 1:
             raise ValidationError('Неправильное количество ингредиента')
-        ingredient_ids.append(ingredient['id'])
-        ingredient_amount.append(amount)
-
-    ings_in_db = Ingredient.objects.filter(
-        pk__in=ingredient_ids)
+        ingredient_id, = parse_ids([ingredient_id], 'Некорректный ингредиент')
+        amounts[ingredient_id] = amounts.get(ingredient_id, 0) + amount
 
-    if not ings_in_db.exists():
+    ings_in_db = Ingredient.objects.in_bulk(amounts)
+    if len(ings_in_db) != len(amounts):
         raise ValidationError('Некорректные ингредиенты')
-
-    valid_ingredients = {}
-    for id, ing, amount in zip(ingredient_ids, ings_in_db, ingredient_amount):
-        valid_ingredients[id] = (ing, amount)
-
-    return valid_ingredients
+    return {ingredient_id: (ings_in_db[ingredient_id], amount)
+            for ingredient_id, amount in amounts.items()}
 
 
 def tags_validator(tag_ids):
@@ -55,7 +60,8 @@ def tags_validator(tag_ids):
 
     if not tag_ids:
         raise ValidationError('Не указаны теги')
-    valid_tags = Tag.objects.filter(id__in=tag_ids)
-    if len(tag_ids) != len(valid_tags):
+    tag_ids = parse_ids(tag_ids, 'Указан некорректный тег')
+    valid_tags = Tag.objects.in_bulk(tag_ids)
+    if len(valid_tags) != len(tag_ids):
         raise ValidationError('Указан некорректный тег')
-    return valid_tags
+    return [valid_tags[tag_id] for tag_id in tag_ids]
@@ -1,39 +1,63 @@
+from django.conf import settings
+from django.db.models import Count, Prefetch, Value
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from api.filters import IngredientFilter, RecipeFilter
-from api.paginators import LimitPagination
-from api.permissions import (IsAdminOrReadOnly, IsAuthorOrAdminOrReadOnly,
-                             IsUserNotBanned)
+from api.cache import ReferenceDataCacheMixin
+from api.exports import (export_response, find_export, render_export,
+                         request_export)
+from api.filters import RecipeFilter
+from api.ingredient_index import search_ingredients
+from api.metrics import collect, get_collector, render_prometheus
+from api.paginators import (LimitOrCursorPagination, LimitPagination,
+                            SubscriptionPagination)
+from api.permissions import (IsAdmin, IsAdminOrReadOnly,
+                             IsAuthorOrAdminOrReadOnly, IsUserNotBanned)
 from api.serializers import (CartSerializer, FavoriteSerializer,
                              IngredientSerializer, RecipeSerializer,
+                             ShoppingListExportSerializer,
                              SubscribeSerializer, TagSerializer,
                              UserSerializer, UserSubscribeSerializer)
 from api.validators import password_validator
-from api.utils import (add_recipe, create_shoping_list,
-                       delete_recipe)
-from foodgram.models import Cart, FavoriteRecipe, Ingredient, Recipe, Tag
+from api.renderers import (CSVRenderer, PDFRenderer, PlainTextRenderer,
+                           PrometheusRenderer)
+from api.shopping_list import (STREAM_FORMATS, build_shopping_list,
+                               stream_shopping_list)
+from api.utils import add_recipe, delete_recipe, get_recipes_limit
+from foodgram.models import (Cart, FavoriteRecipe, Ingredient, Recipe,
+                             ShoppingListExport, Tag)
 from users.models import Subscription, User
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReferenceDataCacheMixin, viewsets.ReadOnlyModelViewSet):
+    cache_namespace = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly, IsUserNotBanned)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReferenceDataCacheMixin,
+                        viewsets.ReadOnlyModelViewSet):
+    cache_namespace = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
     permission_classes = (IsAdminOrReadOnly, IsUserNotBanned)
 
+    def list(self, request, *args, **kwargs):
+        """Поиск ингредиентов по названию через индекс в памяти."""
+
+        return self.cached_response(self.search, request)
+
+    def search(self, request):
+        return Response(search_ingredients(request.query_params.get('name')))
+
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
@@ -41,12 +65,18 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAdminOrReadOnly, IsUserNotBanned)
     pagination_class = LimitPagination
 
+    def get_queryset(self):
+        return User.objects.with_subscription(self.request.user)
+
     @action(detail=False, methods=['get'],
             permission_classes=(IsAuthenticated, IsUserNotBanned))
     def me(self, request):
         """Получить текущего пользователя."""
 
-        serializer = UserSerializer(request.user)
+        # request.user может быть снимком из кэша токенов без части полей.
+        serializer = UserSerializer(
+            self.get_queryset().get(pk=request.user.pk),
+            context={'request': request})
         return Response(serializer.data,
                         status=status.HTTP_200_OK)
 
@@ -90,14 +120,29 @@ class UserViewSet(viewsets.ModelViewSet):
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(methods=('get',), detail=False,
+            pagination_class=SubscriptionPagination,
             permission_classes=(IsAuthenticated, IsUserNotBanned))
     def subscriptions(self, request):
         """Список подписок пользоваетеля."""
 
+        latest_recipes = Recipe.objects.latest_per_author(
+            get_recipes_limit(request)
+        ).order_by('-pub_date', '-pk')
         pages = self.paginate_queryset(
-            User.objects.filter(authors__subscriber=self.request.user)
+            User.objects.filter(
+                authors__subscriber=self.request.user
+            ).annotate(
+                is_subscribed=Value(True),
+                recipes_count=Count('recipes'),
+            ).order_by(
+                'username', 'id'
+            ).prefetch_related(
+                Prefetch('recipes', queryset=latest_recipes,
+                         to_attr='latest_recipes')
+            )
         )
-        serializer = UserSubscribeSerializer(pages, many=True)
+        serializer = UserSubscribeSerializer(pages, many=True,
+                                             context={'request': request})
         return self.get_paginated_response(serializer.data)
 
     def get_permissions(self):
@@ -107,13 +152,16 @@ class UserViewSet(viewsets.ModelViewSet):
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.select_related('author')
+    queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = (IsAuthorOrAdminOrReadOnly, IsUserNotBanned)
-    pagination_class = LimitPagination
+    pagination_class = LimitOrCursorPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        return Recipe.objects.for_listing(self.request.user)
+
     @action(detail=True, permission_classes=(IsAuthenticated, IsUserNotBanned))
     def favorite(self, request, pk):
         """Избранные рецепты."""
@@ -151,8 +199,58 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return delete_recipe(request, Cart, recipe)
 
     @action(methods=('get',), detail=False,
+            renderer_classes=(PDFRenderer, PlainTextRenderer, CSVRenderer,
+                              JSONRenderer),
             permission_classes=(IsAuthenticated, IsUserNotBanned))
     def download_shopping_cart(self, request):
-        """Отправка файла со списком покупок."""
+        """Отправка файла со списком покупок в формате pdf, txt, csv
+        или json: по параметру format или заголовку Accept.
+        Большие pdf списки ставятся в очередь на выгрузку."""
+
+        file_format = request.accepted_renderer.format
+        if file_format in STREAM_FORMATS:
+            return stream_shopping_list(request.user, file_format)
+        shopping_list = build_shopping_list(request.user)
+        export = find_export(request.user, shopping_list)
+        if export is None:
+            if (len(shopping_list['recipes'])
+                    > settings.SHOPPING_LIST_SYNC_RECIPES):
+                return self.queue_export(request, shopping_list)
+            export = render_export(
+                ShoppingListExport(user=request.user), shopping_list)
+        return export_response(export)
+
+    @action(methods=('post',), detail=False,
+            permission_classes=(IsAuthenticated, IsUserNotBanned))
+    def export_shopping_cart(self, request):
+        """Ставит выгрузку списка покупок в очередь."""
+
+        return self.queue_export(request, build_shopping_list(request.user))
+
+    @action(methods=('get',), detail=False,
+            url_path=r'export_shopping_cart/(?P<export_id>\d+)',
+            permission_classes=(IsAuthenticated, IsUserNotBanned))
+    def shopping_cart_export(self, request, export_id):
+        """Статус выгрузки списка покупок или готовый файл."""
+
+        export = get_object_or_404(ShoppingListExport, id=export_id,
+                                   user=request.user)
+        if export.status == ShoppingListExport.DONE:
+            return export_response(export)
+        return Response(ShoppingListExportSerializer(export).data)
+
+    def queue_export(self, request, shopping_list):
+        export = request_export(request.user, shopping_list)
+        return Response(ShoppingListExportSerializer(export).data,
+                        status=status.HTTP_202_ACCEPTED)
+
+
+class MetricsView(APIView):
+    """Метрики всех процессов в формате Prometheus."""
+
+    permission_classes = (IsAdmin,)
+    renderer_classes = (PrometheusRenderer,)
 
-        return create_shoping_list(request.user)
+    def get(self, request):
+        get_collector().flush(force=True)
+        return Response(render_prometheus(collect()))
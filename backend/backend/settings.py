@@ -19,6 +19,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework.authtoken',
     'rest_framework',
     'djoser',
@@ -29,6 +30,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.RequestTimingMiddleware',
+    'api.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -97,6 +101,9 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'collected_static'
+# Каталог тома со статикой, из которого её раздаёт nginx.
+STATIC_PUBLISH_DIR = Path(os.getenv(
+    'STATIC_PUBLISH_DIR', BASE_DIR / 'backend_static' / 'static'))
 
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / MEDIA_URL
@@ -105,7 +112,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 }
 
@@ -120,3 +127,103 @@ DJOSER = {
 }
 
 AUTH_USER_MODEL = 'users.User'
+
+# Версии справочных данных должны быть общими для всех процессов:
+# в docker compose используется файловый кэш на общем томе.
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+)
+CACHE_LOCATION = os.getenv('CACHE_LOCATION', 'foodgram')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+    },
+    # Версии хранятся отдельно, чтобы их не вытесняли ответы.
+    'versions': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.path.join(CACHE_LOCATION, 'versions'),
+        'TIMEOUT': None,
+    },
+    # Версии пользователей для кэша токенов: по ключу на пользователя.
+    'auth': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.path.join(CACHE_LOCATION, 'auth'),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('AUTH_VERSION_CACHE_SIZE', 100000)),
+        },
+    },
+}
+
+RECIPE_IMAGE_MAX_SIZE = int(os.getenv('RECIPE_IMAGE_MAX_SIZE', 5 * 1024 ** 2))
+RECIPE_IMAGE_MAX_PIXELS = 40_000_000
+# Размеры копий изображения рецепта: ширина, высота, обрезка до размера.
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (480, 480, False),
+    'detail': (1200, 1200, False),
+    'pdf': (300, 300, True),
+}
+
+SHOPPING_LIST_PDF_ASSETS = BASE_DIR / 'api' / 'pdf'
+SHOPPING_LIST_SITE_URL = os.getenv('SITE_URL', 'http://localhost')
+SHOPPING_LIST_SYNC_RECIPES = int(os.getenv('SHOPPING_LIST_SYNC_RECIPES', 20))
+SHOPPING_LIST_EXPORT_WORKERS = int(
+    os.getenv('SHOPPING_LIST_EXPORT_WORKERS', 2)
+)
+# Через сколько секунд выгрузка, оставшаяся в обработке после падения
+# обработчика, снова ставится в очередь.
+SHOPPING_LIST_EXPORT_CLAIM_TIMEOUT = int(
+    os.getenv('SHOPPING_LIST_EXPORT_CLAIM_TIMEOUT', 600)
+)
+
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv('PAGINATION_COUNT_CACHE_TTL', 30))
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD', 10000)
+)
+
+RECIPE_SEARCH_CONFIG = 'russian'
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 20))
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+# Доля запросов, для которых замеряется время и собираются запросы к базе.
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.getenv('REQUEST_TIMING_SAMPLE_RATE', 0.01)
+)
+REQUEST_TIMING_SLOW_MS = int(os.getenv('REQUEST_TIMING_SLOW_MS', 500))
+# Сколько одинаковых запросов считать признаком N+1. Несколько
+# обращений к одной таблице по ключу в обычном запросе не в счёт.
+REQUEST_TIMING_DUPLICATE_THRESHOLD = int(
+    os.getenv('REQUEST_TIMING_DUPLICATE_THRESHOLD', 5)
+)
+# Длина SQL в журнале после нормализации.
+REQUEST_TIMING_SQL_LOG_LENGTH = int(
+    os.getenv('REQUEST_TIMING_SQL_LOG_LENGTH', 300)
+)
+
+# Профилирование выключено, пока доля запросов равна нулю.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_PATH_PREFIX = os.getenv('PROFILING_PATH_PREFIX', '/api/')
+PROFILING_DIR = Path(os.getenv('PROFILING_DIR', BASE_DIR / 'profiles'))
+
+# Кэш токенов в каждом процессе. Сброс при изменении пользователя
+# доходит до всех процессов только через общий кэш 'auth' (CACHE_BACKEND).
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 60))
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+# Каталог, в который процессы gunicorn сохраняют свои метрики.
+METRICS_DIR = Path(os.getenv('METRICS_DIR', BASE_DIR / 'metrics'))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
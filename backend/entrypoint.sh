@@ -1,18 +1,19 @@
 #!/bin/sh
+# release - подготовка релиза (статика, миграции, данные, поиск), выполняется один раз;
+# serve - запуск сервера; без аргументов выполняются оба этапа.
 
-echo "Collect static files"
-python manage.py collectstatic --no-input
+release() {
+    python manage.py release
+}
 
-cp -r /app/collected_static/. /app/backend_static/static/
+serve() {
+    echo "Starting server"
+    exec gunicorn backend.wsgi:application --bind 0.0.0.0:8000
+}
 
-python manage.py makemigrations foodgram --no-input
-python manage.py makemigrations users --no-input
-
-echo "Apply database migrations"
-python manage.py migrate --no-input
-
-echo "Add data to database"
-python manage.py scv_script
-
-echo "Starting server"
-gunicorn backend.wsgi:application --bind 0.0.0.0:8000
\ No newline at end of file
+case "$1" in
+    release) release ;;
+    serve) serve ;;
+    "") release && serve ;;
+    *) exec "$@" ;;
+esac
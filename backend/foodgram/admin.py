@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
+from api.search import update_search_vector
+
 from foodgram.models import (Cart, FavoriteRecipe, Ingredient,
                              IngredientRecipe, Recipe, Tag)
 
@@ -48,6 +50,10 @@ class RecipeAdmin(admin.ModelAdmin):
         ('image',),
     )
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        update_search_vector([form.instance.pk])
+
     def in_favorite_recipes(self, obj):
         return obj.favorite.count()
 
@@ -0,0 +1,12 @@
+from django.contrib.postgres.fields import ArrayField
+
+
+class PostgresArrayField(ArrayField):
+    """Массив, который заполняется только в PostgreSQL. В других базах
+    столбец всегда содержит NULL, и приведение типа к массиву
+    в запросы не добавляется."""
+
+    def get_placeholder(self, value, compiler, connection):
+        if connection.vendor != 'postgresql':
+            return '%s'
+        return super().get_placeholder(value, compiler, connection)
@@ -0,0 +1,42 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+VARIANT_FIELDS = {
+    'thumbnail': 'image_thumbnail',
+    'detail': 'image_detail',
+    'pdf': 'image_pdf',
+}
+
+
+def render_variant(image, size, crop):
+    """Уменьшает изображение до size и возвращает JPEG в байтах."""
+
+    if crop:
+        image = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+    else:
+        image = image.copy()
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=85, optimize=True)
+    return output.getvalue()
+
+
+def make_image_variants(recipe):
+    """Создаёт уменьшенные копии изображения рецепта
+    для списков, страницы рецепта и pdf списка покупок."""
+
+    with recipe.image.open('rb') as image_file:
+        image = Image.open(image_file)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    name = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    for variant, (width, height, crop) in (
+            settings.RECIPE_IMAGE_VARIANTS.items()):
+        getattr(recipe, VARIANT_FIELDS[variant]).save(
+            f'{name}_{variant}.jpg',
+            ContentFile(render_variant(image, (width, height), crop)),
+            save=False)
+    recipe.save(update_fields=list(VARIANT_FIELDS.values()))
@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand
+
+from foodgram.images import make_image_variants
+from foodgram.models import Recipe
+
+
+class Command(BaseCommand):
+    """Создаёт уменьшенные копии изображений для рецептов без них."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Пересоздать копии для всех рецептов')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(image=None)
+        if not options['all']:
+            recipes = recipes.filter(image_thumbnail='')
+        processed = 0
+        for recipe in recipes.iterator():
+            try:
+                make_image_variants(recipe)
+            except OSError as error:
+                self.stdout.write(self.style.ERROR(
+                    f'Рецепт {recipe.pk}: {error}'))
+                continue
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано рецептов: {processed}'))
@@ -1,37 +1,144 @@
 import csv
+import hashlib
+import zlib
+from itertools import islice
 
 from django.conf import settings
 from django.core.management import BaseCommand
-from django.db import IntegrityError
+from django.db import DatabaseError, connection, transaction
 
 
+from api.cache import bump_data_version
 from foodgram.models import (
+    DataFileChecksum,
     Ingredient,
     Tag,
 )
 
-TABLES = {
-    Ingredient: 'ingredients.csv',
-    Tag: 'tags.csv',
+# Модель, файл, естественный ключ и обновляемые поля.
+TABLES = (
+    (Ingredient, 'ingredients.csv', ('name', 'measurement_unit'), ()),
+    (Tag, 'tags.csv', ('slug',), ('name', 'color')),
+)
+
+CACHE_NAMESPACES = {
+    Ingredient: 'ingredients',
+    Tag: 'tags',
 }
 
+COUNT_LABELS = {
+    'inserted': 'добавлено',
+    'updated': 'обновлено',
+    'skipped': 'без изменений',
+    'failed': 'ошибок',
+}
+
+# Ключ блокировки, чтобы данные загружал только один процесс.
+LOCK_ID = zlib.crc32(b'foodgram.scv_script')
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as data_file:
+        for chunk in iter(lambda: data_file.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def upsert_batch(model, key_fields, update_fields, rows):
+    """Создаёт отсутствующие объекты и обновляет изменившиеся.
+    Возвращает количество созданных, обновлённых и пропущенных строк."""
+
+    incoming = {}
+    for row in rows:
+        incoming[tuple(row[field] for field in key_fields)] = row
+    lookup = {f'{key_fields[0]}__in': [key[0] for key in incoming]}
+    existing = {
+        tuple(getattr(obj, field) for field in key_fields): obj
+        for obj in model.objects.filter(**lookup)
+    }
+    created, changed = [], []
+    for key, row in incoming.items():
+        obj = existing.get(key)
+        if obj is None:
+            created.append(model(**row))
+            continue
+        updates = {field: row[field] for field in update_fields
+                   if getattr(obj, field) != row[field]}
+        if updates:
+            for field, value in updates.items():
+                setattr(obj, field, value)
+            changed.append(obj)
+    model.objects.bulk_create(created)
+    if changed:
+        model.objects.bulk_update(changed, update_fields)
+    return len(created), len(changed), len(rows) - len(created) - len(changed)
+
 
 class Command(BaseCommand):
-    """Загрузка данных из папки static/data."""
-
-    def handle(self, *args, **kwargs):
-        for model, csv_f in TABLES.items():
-            with open(
-                    f'{settings.BASE_DIR}/foodgram/data/{csv_f}',
-                    'r',
-                    encoding='utf-8'
-            ) as csv_file:
-                reader = csv.DictReader(csv_file)
+    """Загрузка данных из папки static/data.
+    Строки сопоставляются с существующими по естественному ключу,
+    файлы, не изменившиеся с прошлой загрузки, пропускаются."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--force', action='store_true',
+                            help='Загрузить файлы без проверки '
+                                 'контрольной суммы')
+
+    def handle(self, *args, **options):
+        for model, csv_f, key_fields, update_fields in TABLES:
+            path = f'{settings.BASE_DIR}/foodgram/data/{csv_f}'
+            checksum = file_checksum(path)
+            with transaction.atomic():
+                self.lock()
+                if not options['force'] and DataFileChecksum.objects.filter(
+                        name=csv_f, checksum=checksum).exists():
+                    self.stdout.write(f'{csv_f} не изменился')
+                    continue
+                counts = self.load_file(path, model, key_fields,
+                                        update_fields, options['batch_size'])
+                if not counts['failed']:
+                    DataFileChecksum.objects.update_or_create(
+                        name=csv_f, defaults={'checksum': checksum})
+            if counts['inserted'] or counts['updated']:
+                bump_data_version(CACHE_NAMESPACES[model])
+            report = ', '.join(f'{COUNT_LABELS[name]}: {count}'
+                               for name, count in counts.items())
+            style = (self.style.ERROR if counts['failed']
+                     else self.style.SUCCESS)
+            self.stdout.write(style(f'{csv_f}: {report}'))
+
+    def lock(self):
+        """Ждёт, пока другие процессы закончат загрузку данных.
+        Блокировка снимается вместе с завершением транзакции."""
+
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOCK_ID])
+
+    def load_file(self, path, model, key_fields, update_fields, batch_size):
+        counts = dict.fromkeys(COUNT_LABELS, 0)
+        with open(path, 'r', encoding='utf-8') as csv_file:
+            reader = csv.DictReader(csv_file)
+            for number, rows in enumerate(batches(reader, batch_size)):
                 try:
-                    model.objects.bulk_create(
-                        model(**data) for data in reader)
-                except IntegrityError:
+                    with transaction.atomic():
+                        created, updated, skipped = upsert_batch(
+                            model, key_fields, update_fields, rows)
+                except (DatabaseError, TypeError, ValueError) as error:
+                    counts['failed'] += len(rows)
                     self.stdout.write(self.style.ERROR_OUTPUT(
-                        'данные уже были загружены! Или ошибки в csv файлах!'))
+                        f'Пакет {number + 1}: {error}'))
                     continue
-        self.stdout.write(self.style.SUCCESS('Все данные загружены'))
+                counts['inserted'] += created
+                counts['updated'] += updated
+                counts['skipped'] += skipped
+        return counts
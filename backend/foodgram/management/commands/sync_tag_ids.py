@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+from django.db import connection
+
+from foodgram.models import Recipe
+
+
+class Command(BaseCommand):
+    """Пересчитывает массивы tag_ids всех рецептов."""
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                'Массивы тегов используются только с PostgreSQL.'))
+            return
+        updated = Recipe.objects.all().sync_tag_ids()
+        self.stdout.write(self.style.SUCCESS(
+            f'Массивы тегов пересчитаны: {updated}.'))
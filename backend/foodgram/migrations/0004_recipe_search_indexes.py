@@ -0,0 +1,38 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations
+
+# Индексы поиска рецептов существуют только в PostgreSQL,
+# поэтому они создаются вручную и не описаны в Meta модели.
+SEARCH_INDEXES = (
+    GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+    GinIndex(fields=['name'], name='recipe_name_trgm_idx',
+             opclasses=['gin_trgm_ops']),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    recipe = apps.get_model('foodgram', 'Recipe')
+    for index in SEARCH_INDEXES:
+        schema_editor.add_index(recipe, index)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    recipe = apps.get_model('foodgram', 'Recipe')
+    for index in SEARCH_INDEXES:
+        schema_editor.remove_index(recipe, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0003_recipe_fields_and_exports'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
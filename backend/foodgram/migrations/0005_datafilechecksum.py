@@ -0,0 +1,26 @@
+# Generated by Django 3.2.3 on 2026-10-18 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0004_recipe_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataFileChecksum',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Файл')),
+                ('checksum', models.CharField(max_length=64, verbose_name='Контрольная сумма')),
+                ('loaded', models.DateTimeField(auto_now=True, verbose_name='Дата загрузки')),
+            ],
+            options={
+                'verbose_name': 'Файл справочных данных',
+                'verbose_name_plural': 'Файлы справочных данных',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.3 on 2026-10-18 16:56
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Оставляет один ингредиент с одинаковыми названием и единицей
+    измерения и переносит на него ингредиенты рецептов."""
+
+    Ingredient = apps.get_model('foodgram', 'Ingredient')
+    IngredientRecipe = apps.get_model('foodgram', 'IngredientRecipe')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep=Min('id'), total=Count('id')).filter(total__gt=1)
+    for duplicate in duplicates:
+        others = Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit']
+        ).exclude(pk=duplicate['keep'])
+        IngredientRecipe.objects.filter(ingredient__in=others).update(
+            ingredient_id=duplicate['keep'])
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0005_datafilechecksum'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_ingredients,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.3 on 2026-10-18 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Ограничение добавляется отдельной миграцией: в PostgreSQL нельзя
+    менять таблицу в транзакции, где после удаления строк остались
+    отложенные проверки внешних ключей."""
+
+    dependencies = [
+        ('foodgram', '0006_merge_duplicate_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_unit'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-18 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0007_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglistexport',
+            name='claimed',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Взята в обработку'),
+        ),
+    ]
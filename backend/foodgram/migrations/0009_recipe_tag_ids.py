@@ -0,0 +1,53 @@
+# Generated by Django 3.2.3 on 2026-10-18 17:44
+
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations, models
+
+import foodgram.fields
+
+# Индекс по массиву тегов существует только в PostgreSQL,
+# поэтому он создаётся вручную и не описан в Meta модели.
+TAG_IDS_INDEX = GinIndex(fields=['tag_ids'], name='recipe_tag_ids_idx')
+
+
+def fill_tag_ids(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    recipe = apps.get_model('foodgram', 'Recipe')
+    recipe_tags = recipe.tags.through._meta.db_table
+    schema_editor.execute(
+        f'UPDATE {recipe._meta.db_table} SET tag_ids = COALESCE(('
+        f'SELECT array_agg(tag_id ORDER BY tag_id) FROM {recipe_tags} '
+        f'WHERE recipe_id = {recipe._meta.db_table}.id), ARRAY[]::integer[])')
+    schema_editor.add_index(recipe, TAG_IDS_INDEX)
+
+
+def drop_tag_ids_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    recipe = apps.get_model('foodgram', 'Recipe')
+    schema_editor.remove_index(recipe, TAG_IDS_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0008_shoppinglistexport_claimed'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='recipe',
+            name='tags_mask',
+        ),
+        migrations.RemoveField(
+            model_name='tag',
+            name='bit',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_ids',
+            field=foodgram.fields.PostgresArrayField(base_field=models.IntegerField(), editable=False, null=True, size=None),
+        ),
+        migrations.RunPython(fill_tag_ids, drop_tag_ids_index),
+    ]
@@ -1,6 +1,13 @@
-from django.db import models
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models
+from django.db.models import Exists, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
 
-from users.models import User
+from foodgram.fields import PostgresArrayField
+from foodgram.images import make_image_variants
+from users.models import Subscription, User
 
 
 class Ingredient(models.Model):
@@ -19,6 +26,12 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_name_unit'
+            )
+        ]
 
 
 class Tag(models.Model):
@@ -43,6 +56,78 @@ class Tag(models.Model):
         verbose_name_plural = "Тэги"
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов для рецептов."""
+
+    def with_user_flags(self, user):
+        """Добавляет признаки is_favorited и is_in_shopping_cart
+        одним запросом для всех рецептов выборки."""
+
+        if not user.is_authenticated:
+            return self.annotate(is_favorited=Value(False),
+                                 is_in_shopping_cart=Value(False))
+        return self.annotate(
+            is_favorited=Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(Cart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        )
+
+    def with_author_subscription(self, user):
+        """Добавляет признак подписки пользователя на автора рецепта."""
+
+        if not user.is_authenticated:
+            return self.annotate(author_is_subscribed=Value(False))
+        return self.annotate(author_is_subscribed=Exists(
+            Subscription.objects.filter(subscriber=user,
+                                        author=OuterRef('author'))))
+
+    def latest_per_author(self, limit=None):
+        """Оставляет не больше limit последних рецептов каждого автора."""
+
+        if limit is None:
+            return self
+        latest = Recipe.objects.filter(
+            author=OuterRef('author')
+        ).order_by('-pub_date', '-id').values('pk')[:limit]
+        return self.filter(pk__in=Subquery(latest))
+
+    def with_any_tag(self, tags):
+        """Оставляет рецепты хотя бы с одним из тегов. В PostgreSQL
+        проверяет массив tag_ids оператором && по GIN-индексу
+        без соединения с таблицей тегов."""
+
+        if connection.vendor != 'postgresql':
+            return self.filter(tags__in=tags).distinct()
+        return self.filter(tag_ids__overlap=[tag.pk for tag in tags])
+
+    def sync_tag_ids(self):
+        """Пересчитывает tag_ids рецептов выборки по связям с тегами.
+        Массив тегов хранится только в PostgreSQL."""
+
+        if connection.vendor != 'postgresql':
+            return 0
+        tag_ids = Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk')
+        ).values('recipe').annotate(
+            ids=ArrayAgg('tag', ordering='tag')
+        ).values('ids')
+        return self.update(tag_ids=Coalesce(
+            Subquery(tag_ids), Value([]),
+            output_field=ArrayField(models.IntegerField())))
+
+    def for_listing(self, user):
+        """Готовит рецепты к сериализации без запросов на каждый рецепт:
+        автор, теги, ингредиенты и признаки пользователя."""
+
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch('recipe',
+                     queryset=IngredientRecipe.objects.select_related(
+                         'ingredient')),
+        ).with_user_flags(user).with_author_subscription(user)
+
+
 class Recipe(models.Model):
     name = models.CharField(
         'Название рецепта',
@@ -66,6 +151,21 @@ class Recipe(models.Model):
         null=True,
         default=None
     )
+    image_thumbnail = models.ImageField(
+        upload_to='recipes/variants/',
+        blank=True,
+        editable=False
+    )
+    image_detail = models.ImageField(
+        upload_to='recipes/variants/',
+        blank=True,
+        editable=False
+    )
+    image_pdf = models.ImageField(
+        upload_to='recipes/variants/',
+        blank=True,
+        editable=False
+    )
     ingredients = models.ManyToManyField(
         Ingredient, through='IngredientRecipe')
     tags = models.ManyToManyField(
@@ -74,12 +174,45 @@ class Recipe(models.Model):
         related_name="recipes",
     )
     cooking_time = models.PositiveIntegerField()
+    # Копия id тегов рецепта для фильтра по тегам без соединения
+    # таблиц. Заполняется только в PostgreSQL, как и search_vector.
+    tag_ids = PostgresArrayField(
+        models.IntegerField(),
+        null=True,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     def __str__(self):
         return self.name[:15]
 
+    @staticmethod
+    def tag_ids_of(tags):
+        """Значение tag_ids рецепта с тегами tags."""
+
+        if connection.vendor != 'postgresql':
+            return None
+        return sorted(tag.pk for tag in tags)
+
+    def save(self, *args, **kwargs):
+        image_uploaded = bool(self.image) and not self.image._committed
+        super().save(*args, **kwargs)
+        if image_uploaded:
+            make_image_variants(self)
+
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='recipe_author_pub_date_idx'),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -106,6 +239,10 @@ class IngredientRecipe(models.Model):
     class Meta:
         verbose_name = "Интгридиент в рецепте"
         verbose_name_plural = "Интгридиенты в рецепте"
+        indexes = [
+            models.Index(fields=['recipe', 'ingredient'],
+                         name='ingredientrecipe_recipe_idx'),
+        ]
 
 
 class FavoriteRecipe(models.Model):
@@ -157,3 +294,73 @@ class Cart(models.Model):
                 name='unique_cart_user_recipe'
             )
         ]
+
+
+class ShoppingListExport(models.Model):
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, PENDING),
+        (PROCESSING, PROCESSING),
+        (DONE, DONE),
+        (FAILED, FAILED),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_exports',
+        verbose_name='Владелец списка покупок'
+    )
+    cart_hash = models.CharField(
+        'Хэш содержимого корзины',
+        max_length=64,
+        db_index=True)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING)
+    file = models.FileField(
+        'Файл',
+        upload_to='shopping_lists/',
+        blank=True)
+    created = models.DateTimeField(
+        'Дата создания',
+        auto_now_add=True)
+    claimed = models.DateTimeField(
+        'Взята в обработку',
+        null=True,
+        blank=True)
+
+    def __str__(self):
+        return f'{self.user} {self.status}'
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = "Выгрузка списка покупок"
+        verbose_name_plural = "Выгрузки списков покупок"
+
+
+class DataFileChecksum(models.Model):
+    """Контрольная сумма загруженного файла справочных данных."""
+
+    name = models.CharField(
+        'Файл',
+        max_length=255,
+        unique=True)
+    checksum = models.CharField(
+        'Контрольная сумма',
+        max_length=64)
+    loaded = models.DateTimeField(
+        'Дата загрузки',
+        auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Файл справочных данных"
+        verbose_name_plural = "Файлы справочных данных"
@@ -1,5 +1,6 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import Exists, OuterRef, Value
 
 ADMIN = 'admin'
 BANNED = 'banned'
@@ -12,6 +13,24 @@ ROLES_CHOICES = [
 ]
 
 
+class UserQuerySet(models.QuerySet):
+    """Набор запросов для пользователей."""
+
+    def with_subscription(self, user):
+        """Добавляет признак is_subscribed одним запросом
+        для всех пользователей выборки."""
+
+        if not user.is_authenticated:
+            return self.annotate(is_subscribed=Value(False))
+        return self.annotate(is_subscribed=Exists(
+            Subscription.objects.filter(subscriber=user,
+                                        author=OuterRef('pk'))))
+
+
+class CustomUserManager(UserManager.from_queryset(UserQuerySet)):
+    """Менеджер пользователей с методами UserQuerySet."""
+
+
 class User(AbstractUser):
     email = models.EmailField('Электронная почта',
                               unique=True,
@@ -29,6 +48,8 @@ class User(AbstractUser):
         default='user',
     )
 
+    objects = CustomUserManager()
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
@@ -56,6 +77,10 @@ class Subscription(models.Model):
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         ordering = 'author__username',
+        indexes = [
+            models.Index(fields=['subscriber', 'author'],
+                         name='subscription_subscriber_idx'),
+        ]
 
     def __str__(self):
         return f'{self.subscriber} подписан на  {self.author}'